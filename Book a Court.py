@@ -5,8 +5,31 @@ import time
 import os
 # Import the 'sys' module for system-specific parameters and functions, used here to exit the script.
 import sys
-# Import the 'datetime' module to work with dates and times, used for creating unique screenshot filenames.
+# Import the 'datetime' module to work with dates and times, used for parsing the RELEASE_AT moment.
 import datetime
+# Import 'math' to move the clock sync's tick bracket on by whole seconds.
+import math
+# Import 'threading' and 'concurrent.futures' to race several browsers for the same slot in race mode.
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+# Import 'multiprocessing' and 'tempfile' to run several accounts in separate processes that share one launch lock.
+import multiprocessing
+import tempfile
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: launches are then only serialized within one process.
+    fcntl = None
+# Import 'http.client' and 'email.utils' to read the server's clock from HTTP 'Date' headers.
+import http.client
+import email.utils
+from urllib.parse import urlsplit
+# Import 'json' to read the booking configuration (config.json) in batch mode.
+import json
+# Import 're' to turn account names into safe directory and file names.
+import re
+# Import 'shutil' to keep a copy of the patched chromedriver binary between runs.
+import shutil
 # Import the 'load_dotenv' function to load environment variables from a .env file (for local testing).
 from dotenv import load_dotenv
 
@@ -18,12 +41,32 @@ from dotenv import load_dotenv
 
 # 2. ADD this import instead
 import undetected_chromedriver as uc
+# Import the on-disk session cache used to skip the full login flow on reruns and recoveries.
+import session_cache
+# Import the pluggable booking engines; the HTTP engine talks to the reservation iframe's JSON endpoints.
+from http_engine import BookingBackend, HttpBackend, BackendError, AmbiguousBookingError, batch_result, next_date_for_day, DAY_NAMES
+# Import the watcher that reads the availability response from Chrome's performance log (CDP).
+import network_slots
+# Import the ranked time preferences and the availability snapshot store (the full court x time grid per scan).
+import availability
+# Import the daemon building blocks (warm session pool, job scheduler, localhost job API).
+import daemon
+# Import the event-driven waits that resolve on DOM mutations instead of 500 ms polling.
+import dom_waits
+# Import the per-phase timing tracer; every run appends one JSON line to TRACE_FILE.
+import tracing
+# Import the /proc-based sampler that reports the memory and CPU of each account's browser processes.
+from resource_usage import TreeSampler, available_memory
+# Import the retry scheduler that picks the cheapest recovery and paces the attempts around the release window.
+from retry_scheduler import RetryScheduler
+# Import the background diagnostics capture (screenshots are buffered in memory and written on failure).
+from diagnostics import Diagnostics
+# Import the selector resolver that probes all fallback selectors at once and learns which one works.
+from selector_resolver import SelectorResolver
 
 # 3. All other imports can stay the same
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException, TimeoutException, WebDriverException, ElementClickInterceptedException
 
 # ... (rest of your file: custom exceptions, helper functions, etc.) ...
@@ -38,6 +81,106 @@ PASSWORD = os.getenv("PASSWORD")
 TARGET_DAY = os.getenv("TARGET_DAY")
 # Get the target time for booking from the environment variables (e.g., "20:30 - 21:30").
 TARGET_TIME = os.getenv("TARGET_TIME")
+# Ranked preferences (a config.json list) arrive as JSON, e.g. '["20:30 - 21:30", "19:30 - 20:30"]'.
+if TARGET_TIME and TARGET_TIME.lstrip().startswith("["):
+    TARGET_TIME = json.loads(TARGET_TIME)
+# The members added as players 2-4 of every reservation (comma-separated in PLAYERS to override).
+PLAYERS = [p.strip() for p in os.getenv("PLAYERS", "Luc Brenkman,Valentijn Wiegmans,Quinten Wiegmans").split(",") if p.strip()]
+# Get the website to book on; can be pointed at a local stand-in (see mock_site.py) for testing.
+BASE_URL = os.getenv("BASE_URL", "https://www.ltvbest.nl/")
+# Get the moment slots are released (ISO 8601 or a Unix timestamp). When set, the bot runs in armed mode.
+RELEASE_AT = os.getenv("RELEASE_AT")
+# Where to read the server clock in armed mode: the host that releases the slots. Defaults to the origin of
+# BOOKING_API_BASE (the reservation backend) when set, else BASE_URL.
+CLOCK_SYNC_URL = os.getenv("CLOCK_SYNC_URL")
+# How often (in seconds) to keep the parked session alive while waiting for the release moment.
+KEEPALIVE_SECONDS = float(os.getenv("KEEPALIVE_SECONDS", "45"))
+# How long (in seconds) to keep firing the slot search after the release moment before falling back to the normal retry loop.
+FIRE_WINDOW_SECONDS = float(os.getenv("FIRE_WINDOW_SECONDS", "30"))
+# How long (in seconds) a page element may take to appear: normally, and while firing at the release moment.
+WAIT_SECONDS = 15
+FIRE_WAIT_SECONDS = 2
+# Whether to save and restore the logged-in session between runs ("0" disables it).
+SESSION_CACHE = os.getenv("SESSION_CACHE", "1") != "0"
+# Where cached sessions are stored; the directory holds secrets and is kept owner-only.
+SESSION_CACHE_DIR = os.getenv("SESSION_CACHE_DIR", ".session_cache")
+# How long (in hours) a cached session may be reused before a full login is forced.
+SESSION_MAX_AGE_HOURS = float(os.getenv("SESSION_MAX_AGE_HOURS", "12"))
+# Which booking engine to use: "http" (default, falls back to the browser on errors) or "selenium".
+# The HTTP engine needs both BOOKING_API_BASE and a cached session (SESSION_CACHE on, with SESSION_CACHE_DIR
+# kept between runs); without them the default simply falls back to the browser on every run.
+BOOKING_ENGINE = os.getenv("BOOKING_ENGINE", "http").lower()
+# Base URL of the reservation iframe's JSON API (e.g. "https://<reservation-app>/api"); unset by default.
+BOOKING_API_BASE = os.getenv("BOOKING_API_BASE")
+# Endpoint paths under BOOKING_API_BASE as "name=path" pairs, e.g. "availability=v2/slots,players=v2/members".
+# The defaults (http_engine.DEFAULT_PATHS) come from the local stand-in, not from the real site.
+BOOKING_API_PATHS = dict(item.strip().split("=", 1) for item in os.getenv("BOOKING_API_PATHS", "").split(",") if "=" in item)
+# How many browsers to race in parallel for the same slot (1 disables race mode).
+RACE_WORKERS = int(os.getenv("RACE_WORKERS", "1"))
+# Which courts the racing browsers aim at, comma-separated (defaults to "P 1" up to "P <RACE_WORKERS>").
+RACE_COURTS = [c.strip() for c in os.getenv("RACE_COURTS", "").split(",") if c.strip()]
+# How to run: "single" books TARGET_DAY/TARGET_TIME; "batch" books every day in CONFIG_FILE in one browser session.
+RUN_MODE = os.getenv("RUN_MODE", "single").lower()
+# The booking configuration used in batch mode (day name -> time, as generated by index.html).
+CONFIG_FILE = os.getenv("CONFIG_FILE", "config.json")
+# How many search attempts each day gets in batch mode before moving on to the next day.
+BATCH_ATTEMPTS = int(os.getenv("BATCH_ATTEMPTS", "3"))
+# Where per-phase timings are appended as JSON lines (empty disables writing). Summarize with `python tracing.py`.
+TRACE_FILE = os.getenv("TRACE_FILE", "trace.jsonl")
+# Slot search retries: attempt limit, optional time budget in seconds (0 = none) and recovery tiers, cheapest first.
+MAX_ATTEMPTS = int(os.getenv("MAX_ATTEMPTS", "30"))
+SEARCH_BUDGET_SECONDS = float(os.getenv("SEARCH_BUDGET_SECONDS", "0"))
+RECOVERY_TIERS = ["reselect", "refresh", "relogin"]
+# Search failures that mean the court list was not (re)rendered, so only these count against a recovery tier;
+# "no_clickable", "no_free_slot" and "not_released" come from a fresh list that just has nothing to book.
+STALE_LIST_REASONS = ("no_time_text", "unexpected")
+# Consecutive failed attempts on a tier before escalating to the next one.
+ESCALATE_AFTER = int(os.getenv("ESCALATE_AFTER", "3"))
+# Retry every RETRY_INTERVAL seconds during the release window; back off up to RETRY_BACKOFF_MAX seconds after it.
+RELEASE_WINDOW_SECONDS = float(os.getenv("RELEASE_WINDOW_SECONDS", "120"))
+RETRY_INTERVAL = float(os.getenv("RETRY_INTERVAL", "0.25"))
+RETRY_BACKOFF_MAX = float(os.getenv("RETRY_BACKOFF_MAX", "8"))
+# How many distinct failure frames to keep in memory, and whether to save the DOM next to each screenshot.
+DIAGNOSTICS_BUFFER = int(os.getenv("DIAGNOSTICS_BUFFER", "8"))
+DIAGNOSTICS_DOM = os.getenv("DIAGNOSTICS_DOM", "1") != "0"
+# Daemon mode (RUN_MODE=daemon): the local job API, the number of warm browsers, how long before a
+# release a job takes its browser, how often idle browsers are checked, and how long shutdown waits.
+DAEMON_HOST = os.getenv("DAEMON_HOST", "127.0.0.1")
+DAEMON_PORT = int(os.getenv("DAEMON_PORT", "8787"))
+DAEMON_TOKEN = os.getenv("DAEMON_TOKEN")
+DAEMON_POOL_SIZE = int(os.getenv("DAEMON_POOL_SIZE", "2"))
+DAEMON_LEAD_SECONDS = float(os.getenv("DAEMON_LEAD_SECONDS", "90"))
+DAEMON_HEALTH_SECONDS = float(os.getenv("DAEMON_HEALTH_SECONDS", "60"))
+DAEMON_SHUTDOWN_GRACE = float(os.getenv("DAEMON_SHUTDOWN_GRACE", "60"))
+# Multi-account mode (RUN_MODE=accounts): the accounts file (see accounts.example.json), how many browsers may
+# run at once, and where each account's own Chrome profile lives.
+ACCOUNTS_FILE = os.getenv("ACCOUNTS_FILE", "accounts.json")
+MAX_BROWSERS = int(os.getenv("MAX_BROWSERS", "2"))
+ACCOUNTS_PROFILE_DIR = os.getenv("ACCOUNTS_PROFILE_DIR", ".profiles")
+# Where the resolver remembers which selector matched each element (empty keeps it in memory only).
+SELECTOR_CACHE_FILE = os.getenv("SELECTOR_CACHE_FILE", "selector_cache.json")
+# SQLite file that records every scanned availability grid as incremental diffs (empty disables it).
+SNAPSHOT_DB = os.getenv("SNAPSHOT_DB", "availability.db")
+# Browser settings; the defaults reproduce the original launch (headless Chrome 140 with a desktop User-Agent).
+HEADLESS = os.getenv("HEADLESS", "1") != "0"
+USER_AGENT = os.getenv("USER_AGENT", "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
+# The major Chrome version to fetch a matching driver for (empty lets undetected-chromedriver detect it).
+CHROME_VERSION = int(os.getenv("CHROME_VERSION", "140") or 0) or None
+# Where the patched chromedriver binary is kept between runs (empty disables the cache).
+DRIVER_CACHE_DIR = os.getenv("DRIVER_CACHE_DIR", ".driver_cache")
+# Optional persistent Chrome profile, so the HTTP cache (scripts, styles) stays warm between runs.
+USER_DATA_DIR = os.getenv("USER_DATA_DIR")
+# 'eager' returns from page loads at DOMContentLoaded instead of waiting for every image and font.
+PAGE_LOAD_STRATEGY = os.getenv("PAGE_LOAD_STRATEGY", "eager")
+# Block images, fonts and tracker domains the bot never looks at ("0" loads everything).
+BLOCK_RESOURCES = os.getenv("BLOCK_RESOURCES", "1") != "0"
+BLOCKED_DOMAINS = [d.strip() for d in os.getenv("BLOCKED_DOMAINS", "google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,facebook.com/tr,hotjar.com").split(",") if d.strip()]
+# Read slot availability from the network (the iframe's availability response, via CDP) instead of waiting
+# for the court list to render; the DOM scan remains the fallback. Off by default ("1" enables it).
+CDP_SLOT_DETECTION = os.getenv("CDP_SLOT_DETECTION", "0") == "1"
+# Part of the availability request URL, and how long an attempt waits for its response.
+AVAILABILITY_URL_PATTERN = os.getenv("AVAILABILITY_URL_PATTERN", "/availability")
+CDP_RESPONSE_TIMEOUT = float(os.getenv("CDP_RESPONSE_TIMEOUT", "5"))
 
 # --- Custom Exceptions for Clearer Error Handling ---
 # Define a custom error for failures during the initial navigation and login process.
@@ -46,74 +189,72 @@ class NavigationError(Exception): ...
 class SlotSearchError(Exception): ...
 # Define a custom error for failures during the final steps of adding players and confirming.
 class ReservationError(Exception): ...
+# Define a custom error for a racing browser that was stopped because another one is already confirming.
+class ReservationCancelled(Exception): ...
 
 # --- Utility Helper Functions ---
+@tracing.traced("page_ready")
 def wait_for_page_ready(driver, timeout=20):
-    """Waits for the browser's document.readyState to be 'complete'."""
+    """Waits for the browser's document.readyState to be 'complete' ('interactive' with the eager load strategy)."""
     print("  - Waiting for page to be fully loaded...")
+    started = time.perf_counter()
+    # With eager loading the DOM is what we need; images and fonts may still be coming in.
+    interactive = PAGE_LOAD_STRATEGY == "eager"
     try:
-        # Wait until the browser's internal status is 'complete'. This is more reliable than just waiting for an element.
-        WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
-        # As a second check, also wait for the <body> tag to be present in the HTML.
-        WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        print("  - Page is ready.")
+        # Wait until the browser's internal status is ready and the <body> tag exists; resolves on the state change itself.
+        dom_waits.wait_ready(driver, timeout, interactive)
+        print(f"  - Page is ready ({(time.perf_counter() - started) * 1000:.0f} ms).")
         # Return True if the page loaded successfully.
         return True
     except TimeoutException:
         # If the page doesn't load within the timeout period, print a warning and return False.
-        print("⚠️ Page did not reach readyState 'complete' in time.")
+        print(f"⚠️ Page did not reach readyState '{'interactive' if interactive else 'complete'}' in time.")
         return False
 
-def screenshot(driver, prefix):
-    """Takes a screenshot with a descriptive, timestamped filename."""
-    # Create a unique filename using the provided prefix (e.g., 'nav_fail') and the current timestamp.
-    fname = f"{prefix}_{datetime.datetime.now():%Y%m%d_%H%M%S}.png"
-    try:
-        # Use Selenium's built-in function to save a screenshot of the current browser view.
-        driver.save_screenshot(fname)
-        # Confirm that the screenshot was saved.
-        print(f"📸 Saved screenshot: {fname}")
-    except Exception as e:
-        # If saving fails for any reason, print an error message.
-        print(f"⚠️ Could not save screenshot: {e}")
-    # Return the filename for potential future use.
-    return fname
-
-def find_element_with_fallbacks(wait, selectors):
-    """Tries a list of selectors in order and returns the first one that finds an element."""
-    print("  - Searching for element with multiple fallbacks...")
-    # Loop through each selector provided in the list (a list of tuples like (By.XPATH, "//path")).
-    for selector_type, path in selectors:
-        try:
-            # Try to find the element using the current selector.
-            print(f"  - Trying selector: {selector_type} = {path}")
-            # If found, immediately return the element and stop searching.
-            return wait.until(EC.presence_of_element_located((selector_type, path)))
-        except TimeoutException:
-            # If this selector fails (times out), print a message and let the loop continue to the next one.
-            print(f"    - Selector failed.")
-            continue
-    # If the loop finishes without finding the element with any selector, raise an error.
-    raise NoSuchElementException("Element could not be found with any of the provided selectors.")
+def screenshot(driver, prefix, persist=False):
+    """Captures a screenshot (and DOM snapshot) with a descriptive, timestamped filename.
 
-def smarter_click(driver, wait, element):
+    Only the capture happens here; encoding and writing run in the background. Frames are kept in
+    memory and written out if the run fails, unless `persist` asks for the file either way.
+    """
+    # The filename is built from the provided prefix (e.g., 'nav_fail') and the current timestamp.
+    return current_diagnostics().capture(driver, prefix, persist)
+
+# One diagnostics buffer for the whole run, shared by every browser in race mode.
+diagnostics = Diagnostics(DIAGNOSTICS_BUFFER, capture_dom=DIAGNOSTICS_DOM)
+# A daemon job's own buffer, set for the job's thread, so one job's success never discards another's failure frames.
+_job_context = threading.local()
+
+def current_diagnostics():
+    """Returns the diagnostics buffer of the running daemon job, or the run-wide one."""
+    return getattr(_job_context, "diagnostics", None) or diagnostics
+# One resolver for the whole run; the selector statistics it records are shared by every browser in race mode,
+# and written to SELECTOR_CACHE_FILE once the run (or daemon job) is over.
+selector_resolver = SelectorResolver(SELECTOR_CACHE_FILE or None)
+# Every court list scan is handed to this store, which writes it to SNAPSHOT_DB in the background.
+snapshots = availability.SnapshotStore(SNAPSHOT_DB or None)
+
+def find_element_with_fallbacks(driver, target, selectors, timeout=10):
+    """Returns the element for a named target, checking all fallback selectors at once (the first listed one wins)."""
+    print(f"  - Searching for '{target}' with {len(selectors)} fallback selectors...")
+    # Raises NoSuchElementException (and reports it) if none of the selectors matches in time.
+    return selector_resolver.find(driver, target, selectors, timeout)
+
+def smarter_click(driver, timeout, element):
     """Tries a 'human-like' click first, then falls back to a more forceful JavaScript click."""
-    print(f"  - Performing smart click on element: {element.tag_name}...")
+    print("  - Performing smart click...")
     try:
-        # First, explicitly wait for the element to be considered 'clickable' by Selenium.
-        clickable_element = wait.until(EC.element_to_be_clickable(element))
+        # First, wait (event-driven) for the element to be displayed and enabled.
+        clickable_element = dom_waits.wait_element_clickable(driver, element, timeout)
         # Attempt a user-like click by hovering over the element and then clicking.
         ActionChains(driver).move_to_element(clickable_element).click().perform()
         print("    - ActionChains click successful.")
     except (TimeoutException, ElementClickInterceptedException) as e:
         # If the standard click fails (e.g., it's blocked by an overlay), print a warning.
         print(f"⚠️ Standard click failed: {e.__class__.__name__}. Falling back to JavaScript click.")
-        # Scroll the element into the center of the view.
-        driver.execute_script("arguments[0].scrollIntoView({block:'center', inline:'nearest'});", element)
-        # Wait a very short moment for the scroll to complete.
-        time.sleep(0.15)
-        # Execute a direct JavaScript click, which can often bypass UI obstructions.
-        driver.execute_script("arguments[0].click();", element)
+        # Scroll the element into the center of the view and, one animation frame later, execute a direct
+        # JavaScript click, which can often bypass UI obstructions.
+        dom_waits.scroll_and_click(driver, element)
         print("    - JavaScript click successful.")
 
 def is_logged_out(driver):
@@ -130,55 +271,106 @@ def is_logged_out(driver):
         print("    - Login button not found. Current state is LOGGED IN.")
         return False
 
-def _open_court_overview_and_day(driver, wait):
+# The date picker button shows 'Vandaag' until a day is picked and that day's name afterwards, so match any of them.
+DATE_PICKER_XPATH = "//button[" + " or ".join(f"contains(., '{label}')" for label in ["Vandaag"] + DAY_NAMES) + "]"
+
+def _enter_reservation_frame(driver, timeout):
+    """Switches the driver's focus from the main page into the reservation iframe."""
+    driver.switch_to.default_content()
+    driver.switch_to.frame(dom_waits.wait_present(driver, "//iframe", timeout))
+
+@tracing.traced("open_day")
+def _open_court_overview_and_day(driver, timeout, day=None):
     """Handles the repetitive task of navigating into the iframe and selecting the target day."""
+    # Default to the day configured in the environment.
+    day = day or TARGET_DAY
     print("  - Navigating to court overview and selecting day...")
     try:
-        # Switch from the main page content back to the default context.
-        driver.switch_to.default_content()
         # Wait for the reservation iframe to be available and then switch the driver's focus into it.
-        wait.until(EC.frame_to_be_available_and_switch_to_it((By.TAG_NAME, "iframe")))
+        _enter_reservation_frame(driver, timeout)
         print("    - Switched to reservation iframe.")
         # Find the "Court Overview" button.
-        overview_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Overzicht banen')]")))
+        overview_button = dom_waits.wait_clickable(driver, "//button[contains(., 'Overzicht banen')]", timeout)
         # Click the button using our robust click function.
-        smarter_click(driver, wait, overview_button)
+        smarter_click(driver, timeout, overview_button)
         try:
             # Wait briefly for any loading overlay (the grayed-out screen) to disappear.
-            WebDriverWait(driver, 5).until(EC.invisibility_of_element_located((By.CLASS_NAME, "MuiBackdrop-root")))
+            dom_waits.wait_backdrop_gone(driver, 5)
         except TimeoutException: pass # It's okay if there's no overlay.
-        # Find the "Vandaag" (Today) button to open the date picker.
-        today_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Vandaag')]")))
+        # Find the date picker button ("Vandaag", or the day picked earlier) to open the date picker.
+        picker_button = dom_waits.wait_clickable(driver, DATE_PICKER_XPATH, timeout)
         # Click the button.
-        smarter_click(driver, wait, today_button)
+        smarter_click(driver, timeout, picker_button)
         # Find the element for our target day (e.g., "Donderdag").
-        print(f"    - Selecting day: {TARGET_DAY}...")
-        day_element = wait.until(EC.element_to_be_clickable((By.XPATH, f"//span[contains(text(), '{TARGET_DAY}')]")))
+        print(f"    - Selecting day: {day}...")
+        day_element = dom_waits.wait_clickable(driver, f"//span[contains(text(), '{day}')]", timeout)
+        # The availability response this click triggers is the one the slot search should read.
+        _forget_availability(driver)
         # Click the target day.
-        smarter_click(driver, wait, day_element)
+        smarter_click(driver, timeout, day_element)
         # Explicitly wait for the court list to start loading, indicating the page has updated.
         print("    - Waiting for court list to appear...")
-        wait.until(EC.presence_of_element_located((By.XPATH, "//button[contains(@id, 'Accordion-P-1')]")))
+        dom_waits.wait_present(driver, "//button[contains(@id, 'Accordion-P-1')]", timeout)
         print("    - Court list is ready.")
     except Exception as e:
         # If any step in this critical navigation fails, take a screenshot and raise a specific error.
         screenshot(driver, "nav_reopen_fail")
         raise NavigationError(f"Failed to (re)open court overview/day: {e}") from e
 
-def login_and_navigate_to_courts(driver, wait):
+@tracing.traced("reselect_day")
+def _reselect_day(driver, timeout, day=None):
+    """Re-selects the target day inside the already-open iframe so the court list is fetched again."""
+    day = day or TARGET_DAY
+    print(f"  - Re-selecting day {day} to refresh the court list...")
+    try:
+        # The date picker button shows 'Vandaag' or, once a day was chosen, that day's name (any day's).
+        picker_button = dom_waits.wait_clickable(driver, DATE_PICKER_XPATH, timeout)
+        smarter_click(driver, timeout, picker_button)
+        # Click the target day again, which makes the app request fresh availability.
+        day_element = dom_waits.wait_clickable(driver, f"//span[contains(text(), '{day}')]", timeout)
+        watching = _forget_availability(driver)
+        smarter_click(driver, timeout, day_element)
+        if watching:
+            # The slot search reads the fresh availability from the network, so don't wait for the list to render.
+            return
+        try:
+            # Wait briefly for the loading overlay that covers the list while it is fetched.
+            dom_waits.wait_backdrop_gone(driver, 5)
+        except TimeoutException: pass
+        dom_waits.wait_present(driver, "//button[contains(@id, 'Accordion-P-1')]", timeout)
+    except Exception as e:
+        raise NavigationError(f"Failed to re-select day: {e}") from e
+
+def switch_day(driver, timeout, day):
+    """Moves an open session to another day without going back to the homepage."""
+    try:
+        # The cheapest route: pick the day in the date picker of the reservation iframe.
+        _enter_reservation_frame(driver, timeout)
+        _reselect_day(driver, timeout, day)
+    except (NavigationError, WebDriverException) as e:
+        # After a booking the app may show a confirmation instead of the list; start over from the overview.
+        print(f"⚠️ {e}. Re-opening the court overview instead.")
+        driver.switch_to.default_content()
+        if is_logged_out(driver):
+            relogin(driver, timeout, day)
+        else:
+            _open_court_overview_and_day(driver, timeout, day)
+
+@tracing.traced("login")
+def login_and_navigate_to_courts(driver, timeout, day=None):
     """Performs the full login and navigation process from start to finish."""
     print("--- Starting Login and Navigation ---")
     try:
         # Navigate to the website's homepage.
         print("  - Navigating to the website...")
-        driver.get("https://www.ltvbest.nl/")
+        driver.get(BASE_URL)
         # Wait for the page to be fully loaded before doing anything else.
         if not wait_for_page_ready(driver, 20):
             raise NavigationError("Landing page did not fully load in time.")
         # Try to find and click the cookie banner, but don't fail if it's not there.
         try:
-            cookie_button = WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Accepteer')]")))
-            smarter_click(driver, wait, cookie_button)
+            cookie_button = dom_waits.wait_clickable(driver, "//button[contains(., 'Accepteer')]", 5)
+            smarter_click(driver, timeout, cookie_button)
         except TimeoutException: pass
         
         # Find the main login button using a list of possible selectors.
@@ -187,32 +379,40 @@ def login_and_navigate_to_courts(driver, wait):
             (By.XPATH, "//span[text()='Inloggen']"),
             (By.XPATH, "//a[contains(@href, 'login')]") # A fallback selector
         ]
-        login_button = find_element_with_fallbacks(WebDriverWait(driver, 10), login_selectors)
+        login_button = find_element_with_fallbacks(driver, "login_button", login_selectors, 10)
         # Click the login button.
-        smarter_click(driver, wait, login_button)
+        smarter_click(driver, timeout, login_button)
         
         # Enter the user's credentials.
         print("  - Entering credentials...")
-        email_input = wait.until(EC.visibility_of_element_located((By.ID, "login-username")))
+        email_input = dom_waits.wait_visible(driver, "//*[@id='login-username']", timeout)
         email_input.clear(); email_input.send_keys(EMAIL)
         password_input = driver.find_element(By.ID, "login-password")
         password_input.clear(); password_input.send_keys(PASSWORD)
         # Find and click the final submit button.
         submit_button = driver.find_element(By.XPATH, "//input[@value='Inloggen']")
-        smarter_click(driver, wait, submit_button)
+        smarter_click(driver, timeout, submit_button)
         
         # Navigate through the user menu to the reservation page.
         print("  - Navigating to reservation page...")
-        mijnltvbest_link = wait.until(EC.visibility_of_element_located((By.XPATH, "//a[contains(., 'MIJNLTVBEST')]")))
+        mijnltvbest_link = dom_waits.wait_visible(driver, "//a[contains(., 'MIJNLTVBEST')]", timeout)
         ActionChains(driver).move_to_element(mijnltvbest_link).perform() # Hover over the menu
-        reserve_link = wait.until(EC.element_to_be_clickable((By.PARTIAL_LINK_TEXT, "Baan reserveren")))
-        smarter_click(driver, wait, reserve_link) # Click the submenu item
+        reserve_link = dom_waits.wait_clickable(driver, "//a[contains(., 'Baan reserveren')]", timeout)
+        smarter_click(driver, timeout, reserve_link) # Click the submenu item
         
         # Wait for the new reservation page to load.
         if not wait_for_page_ready(driver, 20):
             raise NavigationError("Reservation page did not fully load.")
+        # Remember where the reservation page lives so a cached session can jump straight to it.
+        reservation_url = driver.current_url
         # Call the helper function to enter the iframe and select the correct day.
-        _open_court_overview_and_day(driver, wait)
+        _open_court_overview_and_day(driver, timeout, day)
+        # Cache the fresh session; a failure here must never cost us the booking.
+        if SESSION_CACHE:
+            try:
+                session_cache.save_session(driver, EMAIL, reservation_url, SESSION_CACHE_DIR)
+            except Exception as e:
+                print(f"⚠️ Could not cache session: {e}")
         print("--- Login and Navigation Successful ---")
     except Exception as e:
         # If anything goes wrong, take a screenshot and raise a specific error.
@@ -220,51 +420,180 @@ def login_and_navigate_to_courts(driver, wait):
         if isinstance(e, NavigationError): raise
         raise NavigationError(f"Navigation failed: {e}") from e
 
-def find_and_select_slot(driver, wait):
-    """Searches for and selects the target time slot."""
+@tracing.traced("session_start")
+def start_session(driver, timeout, day=None):
+    """Restores a cached session if it is still valid, otherwise performs the full login."""
+    if SESSION_CACHE:
+        record = session_cache.load_session(EMAIL, SESSION_CACHE_DIR, SESSION_MAX_AGE_HOURS * 3600)
+        # Check the cached cookies with one cheap request before spending any browser time on them.
+        if record and session_cache.is_session_valid(record):
+            print("--- Restoring cached session ---")
+            try:
+                session_cache.restore_session(driver, record)
+                if not wait_for_page_ready(driver, 20) or is_logged_out(driver):
+                    raise NavigationError("Restored session is not logged in.")
+                _open_court_overview_and_day(driver, timeout, day)
+                print("--- Cached session restored ---")
+                return
+            except Exception as e:
+                print(f"⚠️ Could not use cached session: {e}. Falling back to full login.")
+        elif record:
+            print("  - Cached session is no longer valid.")
+        if record:
+            session_cache.invalidate_session(EMAIL, SESSION_CACHE_DIR)
+    login_and_navigate_to_courts(driver, timeout, day)
+
+def relogin(driver, timeout, day=None):
+    """Drops the (now logged-out) cached session and performs a full login."""
+    if SESSION_CACHE:
+        session_cache.invalidate_session(EMAIL, SESSION_CACHE_DIR)
+    login_and_navigate_to_courts(driver, timeout, day)
+
+# In-page script that scans the whole court list in a single WebDriver round trip.
+# It optionally switches to list view and expands closed "P " accordions, then returns every slot
+# as {court, time, clickable, visible} (the full availability grid of the day) plus, as {index, element},
+# the clickable slots that satisfy any of the {time, court} preferences.
+SCAN_SLOTS_JS = r"""
+const prefs = arguments[0], allowClicks = arguments[1];
+const norm = (t) => (t || '').replace(/\s+/g, ' ').trim();
+const result = {toggled: false, expanded: 0, slots: [], candidates: []};
+if (allowClicks) {
+  const toggle = document.querySelector("button[type='button'][value='list']");
+  if (toggle && toggle.getAttribute('aria-pressed') !== 'true') { toggle.click(); result.toggled = true; }
+  document.querySelectorAll("button[class*='MuiAccordionSummary-root']").forEach((btn) => {
+    if (btn.innerText.includes('P ') && btn.getAttribute('aria-expanded') === 'false') { btn.click(); result.expanded++; }
+  });
+}
+document.querySelectorAll("div[class*='css-uu7ccs']").forEach((box) => {
+  const spans = Array.from(box.querySelectorAll('span'));
+  const timeSpan = spans.find((sp) => /\d{1,2}:\d{2}\s*-\s*\d{1,2}:\d{2}/.test(sp.textContent));
+  const accordion = box.closest("[class*='MuiAccordion-root']");
+  const summary = accordion && accordion.querySelector("[class*='MuiAccordionSummary-root']");
+  const radio = box.querySelector("input[type='radio']");
+  const clickable = !(radio && radio.disabled) && !box.classList.contains('Mui-disabled') && box.getAttribute('aria-disabled') !== 'true';
+  const slot = {court: summary ? norm(summary.innerText) : null, time: norm(timeSpan ? timeSpan.textContent : box.textContent),
+                clickable: clickable, visible: box.getClientRects().length > 0};
+  const onCourt = (court) => !court || (slot.court && (slot.court === court || slot.court.startsWith(court + ' ')));
+  if (clickable && prefs.some((pref) => slot.time === pref.time && onCourt(pref.court))) {
+    result.candidates.push({index: result.slots.length, element: radio || box});
+  }
+  result.slots.push(slot);
+});
+return result;
+"""
+
+def _availability_watcher(driver):
+    """Returns the driver's network availability watcher, or None when network detection is off or unusable."""
+    return network_slots.watcher_for(driver, AVAILABILITY_URL_PATTERN) if CDP_SLOT_DETECTION else None
+
+def _forget_availability(driver):
+    """Drops earlier availability responses before a new one is requested; returns True while watching."""
+    watcher = _availability_watcher(driver)
+    if watcher is not None:
+        watcher.discard()
+    return _availability_watcher(driver) is not None
+
+def narrow_by_network(driver, prefs, day=None):
+    """Checks the newest availability response for the preferences.
+
+    Returns (prefs, reason): the preferences narrowed to the free slots the response lists (best
+    first) and None, or an empty list and a failure reason when it shows nothing to book. Without a
+    usable response the preferences come back unchanged, so the DOM scan decides as before.
+    """
+    watcher = _availability_watcher(driver)
+    if watcher is None:
+        return prefs, None
+    with tracing.span("network_availability") as record:
+        data = watcher.latest(CDP_RESPONSE_TIMEOUT)
+        if data is None:
+            record["status"] = "missed"
+            return prefs, None
+        if not isinstance(data, dict) or not isinstance(data.get("courts"), list):
+            # Not the {"released", "courts": [...]} shape this reads; judging by it would end every attempt
+            # with "no free slot", so leave the decision to the court list from now on.
+            watcher.give_up(f"unexpected availability response shape ({type(data).__name__})")
+            record["status"] = "unrecognized"
+            return prefs, None
+        if data.get("released") is False:
+            print("  - Availability response: the day is not released yet.")
+            record["reason"] = "not_released"
+            return [], "not_released"
+        slots = availability.slots_from_payload(data)
+        if day:
+            snapshots.submit(data.get("date") or next_date_for_day(day).isoformat(), day, slots)
+        ranked = availability.rank_free(slots, prefs)
+        free = sum(1 for slot in slots if slot["clickable"])
+        print(f"  - Availability response: {len(ranked)} acceptable free slot(s) ({free} free of {len(slots)}).")
+        record["free"] = len(ranked)
+        if not ranked:
+            return [], "no_free_slot"
+        return [{"time": slots[index]["time"], "court": slots[index]["court"]} for index, _ in ranked], None
+
+def scan_slots(driver, slot_time, allow_clicks=False, court=None):
+    """Runs SCAN_SLOTS_JS for a time (or ranked preferences) and returns its structured result (one round trip)."""
+    return driver.execute_script(SCAN_SLOTS_JS, availability.parse_preferences(slot_time, court), allow_clicks)
+
+@tracing.traced("slot_scan")
+def find_and_select_slot(driver, timeout, slot_time=None, court=None, day=None):
+    """Searches for and selects the best free slot among the ranked time (and court) preferences.
+
+    `slot_time` is a time or a ranked list of preferences (see availability.py); `court` limits the
+    search to one court (race mode). With `day`, the scanned grid is recorded as a snapshot.
+    """
+    # Default to the time configured in the environment.
+    slot_time = slot_time or TARGET_TIME
     try:
-        # Ensure the view is set to 'list' mode for easier searching.
-        print("  - Ensuring list view is active...")
-        try:
-            list_toggle = wait.until(EC.element_to_be_clickable((By.XPATH, "//button[@type='button' and @value='list']")))
-            if list_toggle.get_attribute("aria-pressed") in (None, "false"):
-                smarter_click(driver, wait, list_toggle)
-                time.sleep(0.5)
-        except TimeoutException: print("⚠️ List view toggle not found.")
-        # Find all the court accordions (P1, P2, etc.) and expand any that are closed.
-        print("  - Expanding all Padel court accordions...")
-        try:
-            accordion_buttons = wait.until(EC.presence_of_all_elements_located((By.XPATH, "//button[contains(@class,'MuiAccordionSummary-root')]")))
-            for btn in [b for b in accordion_buttons if "P " in b.text and b.get_attribute("aria-expanded") == "false"]:
-                smarter_click(driver, wait, btn)
-                time.sleep(0.2)
-        except TimeoutException: print("⚠️ No court accordions found.")
-        
-        # Search for the specific time slot text on the page.
-        print(f"  - Searching for time slot: '{TARGET_TIME}'...")
-        time_slot_xpath = f"//span[normalize-space()='{TARGET_TIME}']"
+        prefs = availability.parse_preferences(slot_time, court)
+        if not prefs:
+            print(f"  - None of the preferences can be booked on {court}.")
+            return (False, 'no_preference')
+        # With network detection on, the availability response answers first; the DOM then only has to
+        # show (and click) the free slots it named.
+        narrowed, reason = narrow_by_network(driver, prefs, day)
+        if reason:
+            return (False, reason)
+        # The response already recorded the grid; a list scanned straight after it may still be half-rendered.
+        from_network, prefs = narrowed is not prefs, narrowed
+        wanted_times = sorted({pref["time"] for pref in prefs})
+        # Scan once with clicks allowed, so list view is switched on and closed accordions are expanded.
+        print(f"  - Scanning court list for: {availability.describe(prefs)}...")
+        scan = scan_slots(driver, prefs, allow_clicks=True)
+        if scan["toggled"] or scan["expanded"]:
+            print(f"  - Switched to list view: {scan['toggled']}, expanded {scan['expanded']} accordion(s).")
+            # The clicks only take effect once the app re-renders; what this pass read may be about to be replaced.
+            dom_waits.wait_settled(driver, timeout=min(timeout, 2))
+            scan = scan_slots(driver, prefs, allow_clicks=True)
+
         try:
-            # Wait for at least one element with the target time to be present.
-            wait.until(EC.presence_of_element_located((By.XPATH, time_slot_xpath)))
+            if from_network and not scan["candidates"]:
+                # The list on screen may still be the one from before the re-render; wait until it shows
+                # one of the free slots the response named, then re-scan.
+                dom_waits.wait_slot_free(driver, prefs, timeout)
+                scan = scan_slots(driver, prefs, allow_clicks=True)
+            elif not any(slot["time"] in wanted_times for slot in scan["slots"]):
+                # Wait (event-driven) until the app has rendered a slot with a wanted time, then re-scan once
+                # (again expanding accordions: a list that was not rendered yet had none to expand).
+                dom_waits.wait_slot_listed(driver, wanted_times, timeout)
+                scan = scan_slots(driver, prefs, allow_clicks=True)
         except TimeoutException:
             # If no such text is found, take a screenshot and return a failure status.
-            screenshot(driver, "slot_no_time_text")
-            return (False, 'no_time_text')
-        
-        # Get all elements that match the time slot text.
-        time_spans = driver.find_elements(By.XPATH, time_slot_xpath)
-        print(f"  - Found {len(time_spans)} potential slots for '{TARGET_TIME}'.")
-        # Loop through each found time slot to find one that is clickable.
-        for sp in time_spans:
+            screenshot(driver, "slot_no_clickable" if from_network else "slot_no_time_text")
+            return (False, 'no_clickable' if from_network else 'no_time_text')
+
+        if day and not from_network:
+            snapshots.submit(next_date_for_day(day).isoformat(), day, scan["slots"])
+        # Pick from the grid just scanned: the free slots that satisfy a preference, best preference first.
+        ranked = availability.rank_free(scan["slots"], prefs)
+        elements = {candidate["index"]: candidate["element"] for candidate in scan["candidates"]}
+        free = sum(1 for slot in scan["slots"] if slot["clickable"])
+        print(f"  - Found {len(ranked)} acceptable free slot(s) ({free} free of {len(scan['slots'])} listed).")
+        # Loop through the acceptable slots in order of preference; the first successful click wins.
+        for index, rank in ranked:
+            slot = scan["slots"][index]
             try:
-                # Find the parent container of the time slot text.
-                slot_container = sp.find_element(By.XPATH, "./ancestor::div[contains(@class,'css-uu7ccs')]")
-                # The clickable element is either a radio button inside or the container itself.
-                radio_input = slot_container.find_elements(By.XPATH, ".//input[@type='radio']")
-                target = radio_input[0] if radio_input else slot_container
-                # Click the target.
-                smarter_click(driver, wait, target)
-                print(f"  - ✅ Slot '{TARGET_TIME}' clicked successfully.")
+                smarter_click(driver, timeout, elements[index])
+                fallback = f" (preference #{rank + 1})" if rank else ""
+                print(f"  - ✅ Slot '{slot['time']}' on {slot['court']} clicked successfully{fallback}.")
                 # If the click succeeds, return a success status.
                 return (True, 'ok')
             except Exception: continue # If this specific one fails, try the next one.
@@ -277,32 +606,38 @@ def find_and_select_slot(driver, wait):
         screenshot(driver, "slot_unexpected")
         return (False, 'unexpected')
 
-def complete_reservation(driver, wait):
-    """Finalizes the reservation by adding players and confirming."""
+@tracing.traced("confirm")
+def complete_reservation(driver, timeout, players=None, before_confirm=None):
+    """Finalizes the reservation by adding players and confirming.
+
+    `before_confirm` is called right before the final click; if it returns False the reservation
+    is abandoned with ReservationCancelled (used by race mode so only one browser confirms).
+    """
     print("--- Completing Reservation ---")
+    players = players or PLAYERS
     try:
         # Select the duration and number of players.
         print("  - Selecting 60 minutes and 4 players...")
-        duration_players_button = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[contains(., '60 min.') and contains(., '4')]")))
-        smarter_click(driver, wait, duration_players_button)
+        duration_players_button = dom_waits.wait_clickable(driver, "//div[contains(., '60 min.') and contains(., '4')]", timeout)
+        smarter_click(driver, timeout, duration_players_button)
         # Open the player selection list.
         print("  - Opening player list...")
-        player_2_box = wait.until(EC.element_to_be_clickable((By.XPATH, "//div[normalize-space(.//span)='Speler 2']")))
-        smarter_click(driver, wait, player_2_box)
+        player_2_box = dom_waits.wait_clickable(driver, "//div[normalize-space(.//span)='Speler 2']", timeout)
+        smarter_click(driver, timeout, player_2_box)
         
         # Loop through the list of players to add.
-        for player in ["Luc Brenkman", "Valentijn Wiegmans", "Quinten Wiegmans"]:
+        for player in players:
             print(f"  - Adding player: {player}")
             # Find the "add" button next to the player's name.
-            add_button = wait.until(EC.element_to_be_clickable((By.XPATH, f"//span[text()='{player}']/ancestor::div[contains(@class, 'css-1c1kq07')]/following-sibling::button")))
+            add_button = dom_waits.wait_clickable(driver, f"//span[text()='{player}']/ancestor::div[contains(@class, 'css-1c1kq07')]/following-sibling::button", timeout)
             # Click to add the player.
-            smarter_click(driver, wait, add_button)
+            smarter_click(driver, timeout, add_button)
         
         # Click the final confirmation button.
         print("  - Finding and clicking the final confirmation button...")
         try:
             # First, wait for any final loading overlays to disappear.
-            wait.until(EC.invisibility_of_element_located((By.CLASS_NAME, "MuiBackdrop-root")))
+            dom_waits.wait_backdrop_gone(driver, timeout)
         except TimeoutException: pass
         
         # Use a list of fallback selectors to find the confirmation button.
@@ -311,124 +646,901 @@ def complete_reservation(driver, wait):
             (By.XPATH, "//button[contains(., 'Volgende')]"),
             (By.CSS_SELECTOR, "button.MuiButton-containedPrimary") # A generic fallback
         ]
-        confirm_button = find_element_with_fallbacks(wait, confirm_selectors)
+        confirm_button = find_element_with_fallbacks(driver, "confirm_button", confirm_selectors, timeout)
+        # In race mode, only the browser that wins the claim may press confirm.
+        if before_confirm and not before_confirm():
+            raise ReservationCancelled("Another browser is already confirming a booking.")
         # Click the button.
-        smarter_click(driver, wait, confirm_button)
+        smarter_click(driver, timeout, confirm_button)
 
         # Wait for the success pop-up message to appear.
         print("  - Waiting for success notification...")
-        wait.until(EC.visibility_of_element_located((By.XPATH, "//*[contains(text(), 'succesvol')]")))
+        dom_waits.wait_visible(driver, "//*[contains(text(), 'succesvol')]", timeout)
         print("🎉 Reservation confirmed.")
+    except ReservationCancelled:
+        raise
     except Exception as e:
         # If any step fails, take a screenshot and raise a specific error.
         screenshot(driver, "confirm_fail")
         raise ReservationError(f"Failed to complete reservation: {e}") from e
 
-# --- Main Execution Block ---
-if __name__ == "__main__":
-    # Check if all required environment variables are present.
-    if not all([EMAIL, PASSWORD, TARGET_DAY, TARGET_TIME]):
-        print("❌ Error: Missing one or more required environment variables.")
-        sys.exit(1)
-        
-    # Print a startup message to the log.
-    print(f"🚀 Starting bot for {TARGET_DAY} at {TARGET_TIME}")
-    
+# --- Armed Mode: Clock Sync and Release Timing ---
+def parse_release_at(value):
+    """Converts RELEASE_AT (Unix timestamp or ISO 8601 string) into Unix seconds."""
+    try:
+        # A plain number is taken as a Unix timestamp.
+        return float(value)
+    except ValueError:
+        pass
+    # Python 3.10's fromisoformat does not understand a trailing 'Z', so spell out UTC.
+    release = datetime.datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    # A timestamp without a timezone is interpreted as local time.
+    return release.timestamp()
+
+def _fetch_server_second(conn, path):
+    """Sends one HEAD request and returns the server's 'Date' header as Unix seconds (or None)."""
+    conn.request("HEAD", path)
+    response = conn.getresponse()
+    response.read()
+    date_header = response.getheader("Date")
+    return email.utils.parsedate_to_datetime(date_header).timestamp() if date_header else None
+
+def clock_sync_url():
+    """Returns the URL whose server clock decides the release: CLOCK_SYNC_URL, else the booking API's origin, else BASE_URL."""
+    if CLOCK_SYNC_URL:
+        return CLOCK_SYNC_URL
+    if BOOKING_API_BASE:
+        parts = urlsplit(BOOKING_API_BASE)
+        return f"{parts.scheme}://{parts.netloc}/"
+    return BASE_URL
+
+@tracing.traced("clock_sync")
+def measure_clock_offset(url, max_seconds=6.0, precision=0.01):
+    """Estimates how far the server clock runs ahead of the local clock (in seconds).
+
+    The 'Date' header only has whole seconds, so the offset is pinned down by finding the local moment
+    the server's second ticks over. The first probe brackets that tick within the next second; every
+    further probe is timed (by sleeping, not spinning) for the middle of the bracket and halves it, so
+    about eight requests reach `precision`. A bracket already in the past is moved on by whole
+    seconds: the tick recurs every second, one server second later each time.
+    """
+    print(f"  - Measuring server clock offset against {url}...")
+    parts = urlsplit(url)
+    conn_class = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+    # Reuse one keep-alive connection so every probe has the same, small round trip.
+    conn = conn_class(parts.netloc, timeout=5)
+    path = parts.path or "/"
+    deadline = time.time() + max_seconds
+    first = bracket = None
+    round_trip = 0.0
+
+    def probe():
+        nonlocal round_trip
+        sent = time.time()
+        server_second = _fetch_server_second(conn, path)
+        received = time.time()
+        round_trip = received - sent
+        return (sent + received) / 2, server_second
+
+    try:
+        midpoint, server_second = probe()
+        if server_second is not None:
+            first = (midpoint, server_second)
+            # The server still showed this second at `midpoint`, so the next tick falls in the following second.
+            bracket = [midpoint, midpoint + 1.0, server_second + 1]
+        while bracket and bracket[1] - bracket[0] > precision:
+            target = (bracket[0] + bracket[1]) / 2
+            late = time.time() + round_trip / 2 - target
+            if late > 0:
+                seconds = math.ceil(late)
+                bracket = [bracket[0] + seconds, bracket[1] + seconds, bracket[2] + seconds]
+                target += seconds
+            # Aim the middle of the request's round trip at the middle of the bracket.
+            if target - round_trip / 2 > deadline:
+                break
+            time.sleep(max(0.0, target - round_trip / 2 - time.time()))
+            midpoint, server_second = probe()
+            if server_second is None:
+                break
+            if server_second < bracket[2]:
+                bracket[0] = min(max(bracket[0], midpoint), bracket[1])
+            elif server_second == bracket[2]:
+                bracket[1] = max(min(bracket[1], midpoint), bracket[0])
+            else:
+                # The probe landed past the tick's second altogether (a slow round trip); bracket the next one.
+                bracket = [midpoint, midpoint + 1.0, server_second + 1]
+    except (OSError, http.client.HTTPException, ValueError, TypeError) as e:
+        print(f"⚠️ Clock sync probe failed: {e}")
+    finally:
+        conn.close()
+    if bracket and bracket[1] - bracket[0] < 1.0:
+        offset = bracket[2] - (bracket[0] + bracket[1]) / 2
+        print(f"    - Server clock offset: {offset * 1000:+.0f} ms (±{((bracket[1] - bracket[0]) / 2 + round_trip / 2) * 1000:.0f} ms).")
+        return offset
+    if first:
+        # The tick was not narrowed down in time; assume we were halfway through the server's second.
+        offset = first[1] + 0.5 - first[0]
+        print(f"    - Server clock offset (coarse): {offset * 1000:+.0f} ms.")
+        return offset
+    print("⚠️ Could not read the server clock. Assuming the local clock is correct.")
+    return 0.0
+
+def keep_session_alive(driver, timeout, day=None):
+    """Pokes the parked session so it does not expire, re-logging in if it already did."""
+    print("  - Keep-alive: refreshing parked session...")
+    driver.switch_to.default_content()
+    if is_logged_out(driver):
+        relogin(driver, timeout, day)
+    else:
+        # Re-selecting the day in place makes the site fetch data, which keeps the server-side session warm.
+        switch_day(driver, timeout, day)
+
+@tracing.traced("release_wait")
+def wait_until_release(driver, timeout, release_local, day=None):
+    """Parks on the court overview until the release moment (local clock), keeping the session alive."""
+    print(f"⏳ Armed. Waiting {release_local - time.time():.1f}s for release...")
+    last_keepalive = time.time()
+    while True:
+        remaining = release_local - time.time()
+        if remaining <= 0:
+            break
+        if remaining > 10 and time.time() - last_keepalive >= KEEPALIVE_SECONDS:
+            # Only touch the page well before the release, never during the final approach.
+            try:
+                keep_session_alive(driver, timeout, day)
+            except NavigationError as e:
+                print(f"⚠️ Keep-alive failed: {e}")
+            last_keepalive = time.time()
+        elif remaining > 2:
+            # Sleep coarsely while the release is still far away.
+            time.sleep(min(remaining - 2, 1.0))
+        elif remaining > 0.02:
+            # Sleep almost all the way to the release moment...
+            time.sleep(remaining - 0.02)
+        # ...and spin for the last few milliseconds, since sleep() can overshoot.
+    print(f"🔔 Release moment reached ({(time.time() - release_local) * 1000:+.1f} ms).")
+
+def fire_at_release(driver, timeout, day=None, slot_time=None, court=None, cancelled=None):
+    """Runs the slot search in a tight loop starting at the release moment."""
+    # Use short waits so a miss costs a fraction of a second, not the default 15s.
+    deadline = time.time() + FIRE_WINDOW_SECONDS
+    attempt = 0
+    while time.time() < deadline:
+        # Stop as soon as a racing browser has claimed the booking.
+        if cancelled is not None and cancelled.is_set():
+            return False
+        attempt += 1
+        print(f"\n--- Release fire: Attempt {attempt} ---")
+        try:
+            # The list on screen was fetched before the release, so ask the app for a fresh one.
+            _reselect_day(driver, FIRE_WAIT_SECONDS, day)
+        except NavigationError as e:
+            print(f"⚠️ {e}")
+            continue
+        with tracing.span("release_attempt", n=attempt) as record:
+            ok, reason = find_and_select_slot(driver, FIRE_WAIT_SECONDS, slot_time, court, day)
+            record["reason"] = reason
+        if ok:
+            return True
+        print(f"  - Not yet available (reason: {reason}).")
+    return False
+
+# --- Booking Backends ---
+# uc.Chrome patches a shared chromedriver binary on launch, so parallel launches take turns.
+_DRIVER_LAUNCH_LOCK = threading.Lock()
+
+@contextmanager
+def _launch_lock():
+    """Serializes browser launches across threads and, where file locks exist, across account processes."""
+    with _DRIVER_LAUNCH_LOCK:
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(tempfile.gettempdir(), "book_a_court_launch.lock"), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Static resources the bot never needs; URL patterns for CDP's Network.setBlockedURLs.
+BLOCKED_URL_PATTERNS = ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico",
+                        "*.woff", "*.woff2", "*.ttf", "*.otf", "*.mp4", "*.webm"]
+
+def _chrome_options():
+    """Builds the Chrome options from the browser settings (uc.Chrome does not accept an options object twice)."""
     # Configure Chrome options using uc.ChromeOptions
     chrome_options = uc.ChromeOptions()
-    chrome_options.add_argument("--headless")
+    if HEADLESS:
+        chrome_options.add_argument("--headless")
     chrome_options.add_argument("--no-sandbox")
     chrome_options.add_argument("--disable-dev-shm-usage")
     chrome_options.add_argument("--window-size=1920,1080")
     # Add a realistic User-Agent to be safe
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-    
-    # Initialize the driver variable to None so it exists in the 'finally' block.
-    driver = None
+    if USER_AGENT:
+        chrome_options.add_argument(f"user-agent={USER_AGENT}")
+    chrome_options.page_load_strategy = PAGE_LOAD_STRATEGY
+    if CDP_SLOT_DETECTION:
+        # Let chromedriver record the page's network events, so the availability response can be read.
+        chrome_options.set_capability("goog:loggingPrefs", network_slots.LOGGING_PREFS)
+        chrome_options.add_experimental_option("perfLoggingPrefs", network_slots.PERF_LOGGING_PREFS)
+    return chrome_options
+
+def _cached_driver_path():
+    """Returns where the patched chromedriver for CHROME_VERSION is cached, or None when caching is off."""
+    if not DRIVER_CACHE_DIR:
+        return None
+    suffix = ".exe" if sys.platform.startswith("win") else ""
+    return os.path.abspath(os.path.join(DRIVER_CACHE_DIR, f"chromedriver_{CHROME_VERSION or 'auto'}{suffix}"))
+
+def _store_patched_driver(driver, cached_path):
+    """Keeps a copy of the chromedriver that undetected-chromedriver just downloaded and patched."""
     try:
-        # Set up the WebDriver instance using uc.Chrome
-        # This automatically handles downloading and patching the chromedriver.
-        # The 'Service' and 'ChromeDriverManager' are no longer needed.
-        print("  - Launching undetected browser...")
-        # We explicitly tell it to use version 140, which matches your browser
-        driver = uc.Chrome(version_main=140, options=chrome_options, use_subprocess=True)
-        print("  - Browser launched.")
-        
-        # Set up the default explicit wait time (e.g., 15 seconds).
-        wait = WebDriverWait(driver, 15)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        # Copy next to the target and swap it in, so another process never starts a half-written binary.
+        tmp_path = f"{cached_path}.{os.getpid()}.tmp"
+        shutil.copy2(driver.patcher.executable_path, tmp_path)
+        os.chmod(tmp_path, 0o755)
+        os.replace(tmp_path, cached_path)
+        print(f"  - 💾 Patched chromedriver cached at {cached_path}.")
+    except (OSError, AttributeError) as e:
+        print(f"⚠️ Could not cache the patched chromedriver: {e}")
+
+def block_resources(driver):
+    """Stops the page from downloading images, fonts and tracker scripts (via CDP)."""
+    if not BLOCK_RESOURCES:
+        return
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS + [f"*{d}*" for d in BLOCKED_DOMAINS]})
+    except WebDriverException as e:
+        print(f"⚠️ Could not enable resource blocking: {e}")
+
+@tracing.traced("browser_launch")
+def create_driver(profile_dir=None):
+    """Launches the undetected Chrome browser used by the Selenium flow.
+
+    `profile_dir` overrides USER_DATA_DIR; browsers running at the same time need their own profile.
+    """
+    started = time.perf_counter()
+    # Set up the WebDriver instance using uc.Chrome
+    kwargs = {"version_main": CHROME_VERSION, "use_subprocess": True}
+    profile_dir = profile_dir or USER_DATA_DIR
+    if profile_dir:
+        kwargs["user_data_dir"] = os.path.abspath(profile_dir)
+    print("  - Launching undetected browser...")
+    with _launch_lock():
+        # Reuse the chromedriver patched by an earlier run instead of downloading and patching it again.
+        cached_path = _cached_driver_path()
+        if cached_path and os.path.exists(cached_path):
+            kwargs["driver_executable_path"] = cached_path
+        try:
+            driver = uc.Chrome(options=_chrome_options(), **kwargs)
+        except WebDriverException as e:
+            if "driver_executable_path" not in kwargs:
+                raise
+            # Most likely Chrome was updated and no longer matches the cached driver; fetch a fresh one.
+            print(f"⚠️ Cached chromedriver failed to start ({e.__class__.__name__}); downloading a fresh one.")
+            os.remove(kwargs.pop("driver_executable_path"))
+            driver = uc.Chrome(options=_chrome_options(), **kwargs)
+        if cached_path and "driver_executable_path" not in kwargs:
+            _store_patched_driver(driver, cached_path)
+    block_resources(driver)
+    print(f"  - Browser launched in {time.perf_counter() - started:.1f}s "
+          f"({'cached' if 'driver_executable_path' in kwargs else 'fresh'} driver, page loads: {PAGE_LOAD_STRATEGY}).")
+    return driver
+
+def recover_court_list(driver, timeout, day, tier):
+    """Runs one recovery tier and returns the tier actually used; raises NavigationError if it fails."""
+    if tier == "reselect":
+        # Cheapest: ask the app for a fresh court list from inside the iframe we are already in.
+        _reselect_day(driver, timeout, day)
+        return tier
+    driver.switch_to.default_content()
+    # Check if the bot was logged out; a refresh cannot fix that. Only a detected logout warrants a
+    # re-login: from a logged-in page it cannot work, and it would throw away a valid cached session.
+    if is_logged_out(driver):
+        if tier != "relogin":
+            print("‼️ Detected a logout! Escalating to a re-login...")
+        # The cached session is stale too, so run the full login process again.
+        relogin(driver, timeout, day)
+        return "relogin"
+    if tier == "relogin":
+        print("  - Still logged in; refreshing the page instead of logging in again.")
+    # Still logged in, so the page is likely in a bad state; reload it and re-navigate to the day.
+    driver.refresh()
+    wait_for_page_ready(driver, 20)
+    _open_court_overview_and_day(driver, timeout, day)
+    return "refresh"
+
+def search_slot_with_recovery(driver, timeout, day, slot_time, release_local=None, court=None, cancelled=None, attempts=None):
+    """Finds and clicks the target slot, firing at the release moment in armed mode and recovering between attempts."""
+    # Initialize a flag to track if we've successfully selected a slot.
+    slot_found = False
+    
+    # In armed mode, park on the overview and fire the search at the exact release instant.
+    if release_local is not None:
+        wait_until_release(driver, timeout, release_local, day)
+        slot_found = fire_at_release(driver, timeout, day, slot_time, court, cancelled)
+    if slot_found:
+        return True
+    
+    # Retry tightly while slots are being released (from the release moment, or from now when the run was
+    # simply started at release time) and back off once that window has passed.
+    window_start = release_local if release_local is not None else time.time()
+    scheduler = RetryScheduler(RECOVERY_TIERS, max_attempts=attempts or MAX_ATTEMPTS, budget_seconds=SEARCH_BUDGET_SECONDS or None,
+                               escalate_after=ESCALATE_AFTER, window=(window_start, window_start + RELEASE_WINDOW_SECONDS),
+                               tight_interval=RETRY_INTERVAL, backoff_max=RETRY_BACKOFF_MAX)
+    while not scheduler.exhausted():
+        # In race mode, give up as soon as another browser has claimed the booking.
+        if cancelled is not None and cancelled.is_set():
+            break
+        attempt = scheduler.next_attempt()
+        print(f"\n--- Time slot search: Attempt {attempt}/{scheduler.max_attempts} ---")
         
-        # Run the main login and navigation function.
-        login_and_navigate_to_courts(driver, wait)
+        # Call the function to find and select a slot.
+        with tracing.span("attempt", n=attempt) as record:
+            ok, reason = find_and_select_slot(driver, timeout, slot_time, court, day)
+            record["reason"] = reason
         
-        # Initialize a flag to track if we've successfully selected a slot.
-        slot_found = False
+        # If it returns 'ok' as True, we're done.
+        if ok:
+            slot_found = True
+            break # Exit the loop.
+        # Don't pay for a recovery that no attempt will use.
+        if scheduler.exhausted():
+            break
         
-        # Start the main retry loop. It will try up to 30 times.
-        for attempt in range(30):
-            print(f"\n--- Time slot search: Attempt {attempt + 1}/30 ---")
-            
-            # Call the function to find and select a slot.
-            ok, reason = find_and_select_slot(driver, wait)
-            
-            # If it returns 'ok' as True, we're done.
-            if ok:
-                slot_found = True
-                break # Exit the loop.
-                
-            # If the loop is not on its last iteration, attempt to recover.
-            if attempt < 29:
-                print(f"🔁 Slot search failed (reason: {reason}). Attempting recovery...")
-                
-                # --- State-Aware Recovery Logic ---
-                # Check if the bot was logged out.
-                if is_logged_out(driver):
-                    print("‼️ Detected a logout! Attempting to re-login and navigate...")
-                    try:
-                        # If logged out, try to run the full login process again.
-                        login_and_navigate_to_courts(driver, wait)
-                    except Exception as e:
-                        # If the re-login fails, fall back to a simple page refresh.
-                        print(f"⚠️ Re-login attempt failed: {e}. Falling back to page refresh.")
-                        driver.refresh()
-                else:
-                    # If still logged in, the issue is likely a UI glitch, so just refresh.
-                    print("  - State appears normal. Refreshing page as a standard recovery...")
-                    driver.refresh()
-                    
-                # --- END of State-Aware Recovery ---
+        # --- Tiered Recovery: re-select the day, escalating to a refresh and a re-login only when needed ---
+        # A broken page ('unexpected') skips the cheap tier, and only a list that did not come back counts against
+        # the current tier: a taken or unreleased slot is no reason to reload the whole page.
+        if reason == "unexpected" and scheduler.tier == RECOVERY_TIERS[0]:
+            scheduler.escalate()
+        elif reason in STALE_LIST_REASONS:
+            scheduler.failed()
+        else:
+            scheduler.refreshed()
+        print(f"🔁 Slot search failed (reason: {reason}). Recovering with: {scheduler.tier}...")
+        with tracing.span("recovery", n=attempt) as record:
+            while True:
+                tier = record["action"] = scheduler.tier
                 try:
-                    # After any recovery action, wait for the page and re-navigate to the correct day.
-                    wait_for_page_ready(driver, 20)
-                    _open_court_overview_and_day(driver, wait)
-                except NavigationError as e:
-                    # If even the recovery navigation fails, log it and continue to the next attempt.
-                    print(f"⚠️ Recovery navigation failed: {e}. Continuing to next attempt.")
-                    screenshot(driver, "nav_recover_fail")
-                    
-        # After the loop, check if a slot was ever found.
-        if slot_found:
+                    record["action"] = recover_court_list(driver, timeout, day, tier)
+                    scheduler.recovered(record["action"])
+                    break
+                except (NavigationError, WebDriverException) as e:
+                    if tier == RECOVERY_TIERS[-1]:
+                        record["status"] = "failed"
+                        # Even a re-login failed; leave it to the next attempt (after the pause).
+                        print(f"⚠️ Recovery ({tier}) failed: {e}. Continuing to next attempt.")
+                        screenshot(driver, "nav_recover_fail")
+                        # Don't keep retrying a tier that cannot work; the next failure may escalate again.
+                        scheduler.step_down()
+                        break
+                    # If a cheaper tier cannot bring the list back, escalate straight away.
+                    record.setdefault("failed_tiers", []).append(tier)
+                    scheduler.escalate()
+                    print(f"⚠️ Recovery ({tier}) failed: {e}. Escalating to: {scheduler.tier}...")
+        with tracing.span("retry_pause", n=attempt) as record:
+            record["s"] = round(scheduler.pause(), 3)
+    return slot_found
+
+class SeleniumBackend(BookingBackend):
+    """The browser flow: launch Chrome, log in, find the slot inside the reservation iframe and confirm it."""
+
+    name = "selenium"
+
+    def book(self, day, slot_time, players, release_local=None):
+        # Initialize the driver variable to None so it exists in the 'finally' block.
+        driver = None
+        try:
+            driver = create_driver()
+            # Set up the default explicit wait time (e.g., 15 seconds).
+            timeout = WAIT_SECONDS
+            # Restore the cached session, or run the main login and navigation function.
+            start_session(driver, timeout, day)
+            # After the search, check if a slot was ever found.
+            if not search_slot_with_recovery(driver, timeout, day, slot_time, release_local):
+                # If the loop finished without success, print a final failure message.
+                print("\n❌ FINAL RESULT: Could not find an available time slot.")
+                screenshot(driver, "failure_no_slot", persist=True)
+                return False
             # If yes, proceed to the final reservation steps.
-            complete_reservation(driver, wait)
+            complete_reservation(driver, timeout, players)
             # Take a final success screenshot.
-            screenshot(driver, "success")
+            screenshot(driver, "success", persist=True)
+            return True
+        except Exception as e:
+            # This is a catch-all for any unhandled error during the browser flow.
+            print(f"\n❌ An unrecoverable error occurred: {e}")
+            if driver: screenshot(driver, "fatal_error", persist=True)
+            raise BackendError(f"Selenium flow failed: {e}") from e
+        finally:
+            # This block will run no matter what happens (success or failure).
+            if driver:
+                # If the driver was successfully created, ensure it's closed to free up resources.
+                print("\nClosing browser session.")
+                driver.quit()
+
+    def book_batch(self, jobs, players, release_local=None):
+        """Books every (day, time) job in one browser session, switching days through the date picker."""
+        results = []
+        driver = None
+        try:
+            driver = create_driver()
+            timeout = WAIT_SECONDS
+            session_ready = False
+            for day, slot_time in jobs:
+                print(f"\n📅 Batch: {day} at {availability.describe(slot_time)}")
+                try:
+                    if not session_ready:
+                        # The first day pays for the login (or session restore); the rest reuse it.
+                        start_session(driver, timeout, day)
+                        session_ready = True
+                    else:
+                        switch_day(driver, timeout, day)
+                    if search_slot_with_recovery(driver, timeout, day, slot_time, release_local, attempts=BATCH_ATTEMPTS):
+                        complete_reservation(driver, timeout, players)
+                        screenshot(driver, f"success_{day}", persist=True)
+                        results.append(batch_result(day, slot_time, "booked", self.name))
+                    else:
+                        screenshot(driver, f"failure_no_slot_{day}", persist=True)
+                        results.append(batch_result(day, slot_time, "no_slot", self.name))
+                except (NavigationError, ReservationError, WebDriverException) as e:
+                    # One day failing must not stop the others; the next day re-enters the overview.
+                    print(f"❌ {day} failed: {e}")
+                    results.append(batch_result(day, slot_time, "error", self.name, str(e)))
+        except Exception as e:
+            # The browser itself could not be launched or crashed; every remaining day is an engine failure.
+            print(f"\n❌ An unrecoverable error occurred: {e}")
+            if driver: screenshot(driver, "fatal_error", persist=True)
+            # Days are reported in order, so the ones without a result yet are exactly the rest of the list.
+            results += [batch_result(day, slot_time, "error", self.name, str(e)) for day, slot_time in jobs[len(results):]]
+        finally:
+            if driver:
+                print("\nClosing browser session.")
+                driver.quit()
+        return results
+
+class BookingClaim:
+    """Lets exactly one racing browser press confirm; every other browser is cancelled before it can."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.winner = None
+        # Set the moment a browser claims the booking, so the others stop searching.
+        self.cancelled = threading.Event()
+
+    def try_claim(self, worker):
+        """Claims the right to confirm. The claim is never released: a confirm click whose outcome is
+        unknown may still have booked, so nobody else may confirm after it (at most one booking)."""
+        with self._lock:
+            if self.winner is not None:
+                return False
+            self.winner = worker
+            self.cancelled.set()
+            return True
+
+class RaceSeleniumBackend(SeleniumBackend):
+    """Races several browsers, each aimed at a different court, for the same time; the first to confirm wins."""
+
+    name = "selenium-race"
+    # Batches run one race per day rather than sharing a single session.
+    book_batch = BookingBackend.book_batch
+
+    def __init__(self, workers=None, courts=None):
+        self.workers = max(1, workers or RACE_WORKERS)
+        self.courts = courts or RACE_COURTS or [f"P {n}" for n in range(1, self.workers + 1)]
+        self._drivers = []
+        self._drivers_lock = threading.Lock()
+
+    def _race_one(self, court, claim, day, slot_time, players, release_local):
+        """One racing browser: log in, search its court and confirm only if it wins the claim."""
+        if claim.cancelled.is_set():
+            return False
+        # Parallel browsers cannot share a profile, so each court gets its own below USER_DATA_DIR.
+        driver = create_driver(os.path.join(USER_DATA_DIR, court.replace(" ", "_")) if USER_DATA_DIR else None)
+        with self._drivers_lock:
+            self._drivers.append(driver)
+        timeout = WAIT_SECONDS
+        print(f"🏁 [{court}] Browser ready, logging in...")
+        start_session(driver, timeout, day)
+        if not search_slot_with_recovery(driver, timeout, day, slot_time, release_local, court, claim.cancelled):
+            return False
+        try:
+            complete_reservation(driver, timeout, players, before_confirm=lambda: claim.try_claim(court))
+        except ReservationCancelled:
+            print(f"🛑 [{court}] Cancelled: another browser is confirming.")
+            return False
+        screenshot(driver, "success", persist=True)
+        return True
+
+    def book(self, day, slot_time, players, release_local=None):
+        print(f"🏎️ Race mode: {len(self.courts)} court(s) {', '.join(self.courts)} with up to {self.workers} browser(s).")
+        claim = BookingClaim()
+        errors = []
+        booked = False
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="race") as pool:
+                futures = {pool.submit(self._race_one, court, claim, day, slot_time, players, release_local): court for court in self.courts}
+                for future in as_completed(futures):
+                    try:
+                        booked = future.result() or booked
+                    except Exception as e:
+                        print(f"⚠️ [{futures[future]}] Racing browser failed: {e}")
+                        errors.append(e)
+        finally:
+            self.close()
+        if booked:
+            print(f"🏆 Booking confirmed on {claim.winner}.")
+            return True
+        if claim.winner is not None:
+            # The winner pressed confirm but never saw the success message; do not let a fallback (or a batch)
+            # book again: the day is reported as uncertain and the other days still get their turn.
+            raise AmbiguousBookingError(f"Confirmation on {claim.winner} is unverified; not retrying to avoid a double booking.")
+        if errors and len(errors) == len(self.courts):
+            raise BackendError(f"All racing browsers failed: {errors[0]}")
+        print("\n❌ FINAL RESULT: Could not find an available time slot.")
+        return False
+
+    def close(self):
+        # Quit every browser, including ones whose worker crashed halfway.
+        with self._drivers_lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception as e:
+                print(f"⚠️ Could not close a racing browser: {e}")
+
+def create_backends():
+    """Returns the backend factories to try, in order, for the configured BOOKING_ENGINE."""
+    def http_backend():
+        record = session_cache.load_session(EMAIL, SESSION_CACHE_DIR, SESSION_MAX_AGE_HOURS * 3600) if SESSION_CACHE else None
+        return HttpBackend(BOOKING_API_BASE, record, paths=BOOKING_API_PATHS)
+    browser_backend = RaceSeleniumBackend if RACE_WORKERS > 1 else SeleniumBackend
+    if BOOKING_ENGINE == "selenium":
+        return [browser_backend]
+    # The HTTP engine goes first; the browser takes over if it errors.
+    return [http_backend, browser_backend]
+
+def book_with_fallback(day, slot_time, players, release_local=None):
+    """Books with the first backend that does not error. Returns True when a reservation was confirmed."""
+    factories = create_backends()
+    for index, factory in enumerate(factories):
+        backend = None
+        try:
+            backend = factory()
+            print(f"⚙️ Booking engine: {backend.name}")
+            with tracing.span("engine", engine=backend.name):
+                return backend.book(day, slot_time, players, release_local)
+        except BackendError as e:
+            # Only engine failures trigger the fallback; "no slot available" is a real answer.
+            if index == len(factories) - 1: raise
+            print(f"⚠️ Booking engine failed: {e}. Falling back to the next engine.")
+        finally:
+            if backend: backend.close()
+
+def book_batch_with_fallback(jobs, players, release_local=None):
+    """Books every job, retrying days whose engine failed on the next engine. Returns one result per job."""
+    # Keyed by position in `jobs`: a job's time preferences may be a (unhashable) ranked list.
+    results = {}
+    pending = list(range(len(jobs)))
+    factories = create_backends()
+    for index, factory in enumerate(factories):
+        if not pending:
+            break
+        is_last = index == len(factories) - 1
+        try:
+            backend = factory()
+        except BackendError as e:
+            print(f"⚠️ Booking engine unavailable: {e}")
+            if is_last:
+                results.update({i: batch_result(*jobs[i], "error", "none", str(e)) for i in pending})
+            continue
+        print(f"⚙️ Booking engine: {backend.name}")
+        try:
+            with tracing.span("engine", engine=backend.name, days=len(pending)):
+                batch = backend.book_batch([jobs[i] for i in pending], players, release_local)
+            # Backends report one result per job, in the order the jobs were given.
+            results.update(zip(pending, batch))
+        finally:
+            backend.close()
+        # Only engine failures move on to the next engine; booked, no_slot and uncertain days are final.
+        pending = [i for i in pending if results[i]["status"] == "error"]
+    return [results[i] for i in range(len(jobs))]
+
+# --- Daemon Mode ---
+class BrowserSession:
+    """A warm, logged-in browser parked on the court overview, owned by the daemon's pool."""
+
+    # Profile subdirectories in use, so pooled browsers never share a USER_DATA_DIR profile.
+    _profiles_in_use = set()
+    _profiles_lock = threading.Lock()
+
+    def __init__(self, day):
+        self.day = day
+        self.profile = None
+        if USER_DATA_DIR:
+            with self._profiles_lock:
+                self.profile = min(set(range(len(self._profiles_in_use) + 1)) - self._profiles_in_use)
+                self._profiles_in_use.add(self.profile)
+        self.driver = None
+        try:
+            self.driver = create_driver(os.path.join(USER_DATA_DIR, f"daemon_{self.profile}") if USER_DATA_DIR else None)
+            self.timeout = WAIT_SECONDS
+            start_session(self.driver, self.timeout, day)
+        except Exception:
+            self.close()
+            raise
+
+    def is_healthy(self):
+        """Pokes the session (which keeps it alive server-side) and reports whether it is still logged in."""
+        try:
+            self.driver.switch_to.default_content()
+            if is_logged_out(self.driver):
+                return False
+            # Re-selecting the parked day makes the site fetch data; a dead session bounces to the homepage.
+            switch_day(self.driver, self.timeout, self.day)
+            return True
+        except (NavigationError, WebDriverException) as e:
+            print(f"⚠️ Session health check failed: {e}")
+            return False
+
+    def close(self):
+        if self.driver:
+            self.driver.quit()
+            self.driver = None
+        if self.profile is not None:
+            with self._profiles_lock:
+                self._profiles_in_use.discard(self.profile)
+            self.profile = None
+
+def run_daemon_job(session, job):
+    """Books one daemon job on a warm session and returns its status ('booked' or 'no_slot').
+
+    Jobs run side by side, so each one gets its own trace run and diagnostics buffer (local to its thread).
+    """
+    driver, timeout, day = session.driver, session.timeout, job["day"]
+    job_diagnostics = _job_context.diagnostics = Diagnostics(DIAGNOSTICS_BUFFER, capture_dom=DIAGNOSTICS_DOM,
+                                                             name_prefix=f"job_{job['id']}_")
+    tracing.start_run(thread_local=True, mode="daemon", job=job["id"], day=day, time=job["time"],
+                      armed=job["release_at"] is not None)
+    outcome = "error"
+    try:
+        release_local = None
+        if job["release_at"] is not None:
+            # Sync just before the release; the server clock may have drifted since the daemon started.
+            release_local = job["release_at"] - measure_clock_offset(clock_sync_url())
+        # Only the day changes between jobs, so stay logged in and pick it in the date picker.
+        switch_day(driver, timeout, day)
+        session.day = day
+        if not search_slot_with_recovery(driver, timeout, day, job["time"], release_local):
+            screenshot(driver, f"failure_no_slot_{day}", persist=True)
+            outcome = "no_slot"
+            return outcome
+        complete_reservation(driver, timeout, job["players"] or PLAYERS)
+        screenshot(driver, f"success_{day}", persist=True)
+        outcome = "booked"
+        return outcome
+    finally:
+        # Keep the job's failure frames only when it did not book.
+        if outcome == "booked":
+            job_diagnostics.discard()
+        else:
+            job_diagnostics.flush()
+        job_diagnostics.close()
+        _job_context.diagnostics = None
+        tracing.finish_run(TRACE_FILE, outcome)
+        # The daemon never ends like a run does, so save the selector statistics after every job.
+        selector_resolver.save()
+
+def validate_daemon_job(body):
+    """Returns an error message for an invalid job request, or None."""
+    if body.get("day") not in DAY_NAMES:
+        return f"'day' must be one of: {', '.join(DAY_NAMES)}"
+    try:
+        availability.parse_preferences(body.get("time"))
+    except ValueError:
+        return "'time' is required: a time like '20:30 - 21:30' or a ranked list of times / {time, court} objects"
+    players = body.get("players")
+    if players is not None and not (isinstance(players, list) and all(isinstance(p, str) for p in players)):
+        return "'players' must be a list of names"
+    return None
+
+def run_booking_daemon():
+    """Keeps warm browsers ready and books the jobs posted to the local API until stopped."""
+    # Park new browsers on TARGET_DAY if given, else tomorrow (always listed in the date picker).
+    park_day = TARGET_DAY or DAY_NAMES[(datetime.date.today() + datetime.timedelta(days=1)).weekday()]
+    pool = daemon.SessionPool(lambda: BrowserSession(park_day), BrowserSession.is_healthy, BrowserSession.close, DAEMON_POOL_SIZE)
+    scheduler = daemon.JobScheduler(pool, run_daemon_job, DAEMON_LEAD_SECONDS, parse_release_at)
+    daemon.run(pool, scheduler, DAEMON_HOST, DAEMON_PORT, DAEMON_TOKEN, validate_daemon_job,
+               DAEMON_HEALTH_SECONDS, DAEMON_SHUTDOWN_GRACE)
+
+def load_config(path):
+    """Reads config.json and returns its (day, time preferences) jobs in the order they are listed.
+
+    A day maps to a time, or to a ranked list of acceptable times / {"time", "court"} objects.
+    """
+    with open(path, encoding="utf-8") as f:
+        config = json.load(f)
+    for day, preferences in config.items():
+        try:
+            availability.parse_preferences(preferences)
+        except ValueError as e:
+            raise ValueError(f"{path}: {day}: {e}")
+    return list(config.items())
+
+# --- Multi-Account Mode ---
+def load_accounts(path):
+    """Reads ACCOUNTS_FILE: a list of accounts, each with credentials, {day: time} bookings and players.
+
+    Credentials are given directly ("email", "password") or, preferably, as the names of environment
+    variables holding them ("email_env", "password_env"). "players" defaults to PLAYERS.
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    accounts = []
+    for n, entry in enumerate(entries, 1):
+        name = entry.get("name") or f"account{n}"
+        email = entry.get("email") or (os.getenv(entry["email_env"]) if entry.get("email_env") else None)
+        password = entry.get("password") or (os.getenv(entry["password_env"]) if entry.get("password_env") else None)
+        if not email or not password:
+            raise ValueError(f"Account '{name}' has no credentials (set email/password or email_env/password_env).")
+        if not entry.get("bookings"):
+            raise ValueError(f"Account '{name}' has no bookings.")
+        for day, preferences in entry["bookings"].items():
+            try:
+                availability.parse_preferences(preferences)
+            except ValueError as e:
+                raise ValueError(f"Account '{name}': {day}: {e}")
+        if any(a["name"] == name for a in accounts):
+            raise ValueError(f"Account name '{name}' is used twice.")
+        accounts.append({"name": name, "email": email, "password": password,
+                         "jobs": list(entry["bookings"].items()), "players": entry.get("players") or PLAYERS})
+    return accounts
+
+def run_account(account, release_local=None):
+    """Books every day of one account. Runs in its own worker process; returns its results and resource use."""
+    global EMAIL, PASSWORD, USER_DATA_DIR
+    # Each worker process has its own copy of these globals, so accounts never see each other's login.
+    EMAIL, PASSWORD = account["email"], account["password"]
+    slug = re.sub(r"[^A-Za-z0-9_-]+", "_", account["name"])
+    # A profile (cookies, cache) per account, so sessions can never leak between members.
+    USER_DATA_DIR = os.path.join(ACCOUNTS_PROFILE_DIR, slug)
+    diagnostics.name_prefix = f"{slug}_"
+    tracing.start_run(mode="accounts", account=account["name"], engine=BOOKING_ENGINE, armed=release_local is not None)
+    # Account for this worker and everything it starts (chromedriver, Chrome and its helper processes).
+    sampler = TreeSampler().start()
+    outcome = "error"
+    try:
+        print(f"👤 [{account['name']}] Booking {len(account['jobs'])} day(s).")
+        results = book_batch_with_fallback(account["jobs"], account["players"], release_local)
+        outcome = "batch_ok" if all(r["status"] in ("booked", "no_slot") for r in results) else "batch_failed"
+    except Exception as e:
+        print(f"❌ [{account['name']}] An unrecoverable error occurred: {e}")
+        results = [batch_result(day, slot_time, "error", "-", str(e)) for day, slot_time in account["jobs"]]
+    finally:
+        usage = sampler.stop()
+        snapshots.drain()
+        selector_resolver.save()
+        if outcome == "batch_ok":
+            diagnostics.discard()
+        else:
+            diagnostics.flush()
+        tracing.finish_run(TRACE_FILE, outcome)
+    return {"account": account["name"], "results": results, "usage": usage}
+
+def book_accounts(accounts, release_local=None):
+    """Runs every account in its own process, at most MAX_BROWSERS at a time, and returns one report per account."""
+    workers = max(1, min(MAX_BROWSERS, len(accounts)))
+    print(f"👥 Booking for {len(accounts)} account(s) with up to {workers} browser(s) at once.")
+    reports = {}
+    # 'spawn' gives every worker a fresh interpreter, with nothing inherited from this process's threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = {pool.submit(run_account, account, release_local): account for account in accounts}
+        for future in as_completed(futures):
+            account = futures[future]
+            try:
+                reports[account["name"]] = future.result()
+            except Exception as e:
+                # The worker process itself died (e.g. killed for running out of memory).
+                reports[account["name"]] = {"account": account["name"], "usage": {},
+                                            "results": [batch_result(day, slot_time, "error", "-", f"worker crashed: {e}")
+                                                        for day, slot_time in account["jobs"]]}
+    return [reports[account["name"]] for account in accounts]
+
+def print_accounts_summary(reports):
+    """Prints the results and resource use per account and returns True if no account hit a real failure."""
+    all_ok = True
+    for report in reports:
+        print(f"\n👤 {report['account']}")
+        all_ok = print_batch_summary(report["results"]) and all_ok
+        usage = report["usage"]
+        if usage:
+            print(f"   Resources: peak {usage['peak_rss_mb']:.0f} MB (avg {usage['avg_rss_mb']:.0f} MB) over {usage['peak_processes']} processes, "
+                  f"{usage['cpu_seconds']:.1f}s CPU ({usage['cpu_percent']:.0f}% of a core) in {usage['wall_seconds']:.0f}s")
+    usages = [r["usage"] for r in reports if r["usage"]]
+    if usages:
+        # Size the machine for the heaviest session seen.
+        peak_mb = max(u["peak_rss_mb"] for u in usages)
+        cpu_share = max(u["cpu_percent"] for u in usages) / 100
+        free_mb = (available_memory() or 0) / 2 ** 20
+        by_memory = int(free_mb // peak_mb) if peak_mb else 0
+        by_cpu = int((os.cpu_count() or 1) // cpu_share) if cpu_share else by_memory
+        print(f"\n📊 One account session peaks at {peak_mb:.0f} MB and {cpu_share * 100:.0f}% of a core. With {free_mb:.0f} MB free "
+              f"and {os.cpu_count()} core(s), this machine can sustain about {min(by_memory, by_cpu)} concurrent session(s) "
+              f"(memory allows {by_memory}, CPU {by_cpu}).")
+    return all_ok
+
+def print_batch_summary(results):
+    """Prints one line per day and returns True if no day ended in a real failure."""
+    icons = {"booked": "✅", "no_slot": "➖", "error": "❌", "uncertain": "⚠️"}
+    print("\n--- Batch Summary ---")
+    for r in results:
+        detail = f" ({r['detail']})" if r["detail"] else ""
+        print(f"{icons.get(r['status'], '?')} {r['day']:<10} {availability.describe(r['time']):<15} {r['status']:<10} via {r['engine']}{detail}")
+    # A day without a free slot is a normal outcome; engine errors and unverified bookings are real failures.
+    return not any(r["status"] in ("error", "uncertain") for r in results)
+
+# --- Main Execution Block ---
+if __name__ == "__main__":
+    # Check if all required environment variables are present (batch mode takes its days from CONFIG_FILE,
+    # daemon mode from its job API, and accounts mode its logins and days from ACCOUNTS_FILE).
+    needs_login = RUN_MODE != "accounts"
+    needs_target = RUN_MODE not in ("batch", "daemon", "accounts")
+    if (needs_login and not all([EMAIL, PASSWORD])) or (needs_target and not all([TARGET_DAY, TARGET_TIME])):
+        print("❌ Error: Missing one or more required environment variables.")
+        sys.exit(1)
+    
+    if RUN_MODE == "daemon":
+        # A long-running process; every job is traced as its own run (see run_daemon_job).
+        run_booking_daemon()
+        sys.exit(0)
+        
+    # Time every phase of this run; the record is written out however the run ends.
+    tracing.start_run(mode=RUN_MODE, day=TARGET_DAY, time=TARGET_TIME, engine=BOOKING_ENGINE, armed=bool(RELEASE_AT))
+    outcome = "error"
+    try:
+        # In armed mode, measure the server clock before anything time-critical happens.
+        release_local = None
+        if RELEASE_AT:
+            release_local = parse_release_at(RELEASE_AT) - measure_clock_offset(clock_sync_url())
+        
+        if RUN_MODE == "accounts":
+            # One process (and browser) per account, all aimed at the same release moment.
+            accounts_ok = print_accounts_summary(book_accounts(load_accounts(ACCOUNTS_FILE), release_local))
+            outcome = "accounts_ok" if accounts_ok else "accounts_failed"
+            sys.exit(0 if accounts_ok else 1)
+        
+        if RUN_MODE == "batch":
+            jobs = load_config(CONFIG_FILE)
+            print(f"🚀 Starting batch for {len(jobs)} day(s): {', '.join(day for day, _ in jobs)}")
+            # Exit non-zero only when a day hit a real failure.
+            batch_ok = print_batch_summary(book_batch_with_fallback(jobs, PLAYERS, release_local))
+            outcome = "batch_ok" if batch_ok else "batch_failed"
+            sys.exit(0 if batch_ok else 1)
+        
+        # Print a startup message to the log.
+        print(f"🚀 Starting bot for {TARGET_DAY} at {availability.describe(TARGET_TIME)}")
+        if book_with_fallback(TARGET_DAY, TARGET_TIME, PLAYERS, release_local):
+            outcome = "booked"
             print("✅ Done.")
         else:
-            # If the loop finished without success, print a final failure message.
-            print("\n❌ FINAL RESULT: Could not find an available time slot.")
-            screenshot(driver, "failure_no_slot")
+            outcome = "no_slot"
             # Exit with a non-zero status code to make the GitHub Action fail.
             sys.exit(1)
-            
     except Exception as e:
         # This is a catch-all for any unhandled error during the entire process.
         print(f"\n❌ An unrecoverable error occurred: {e}")
-        if driver: screenshot(driver, "fatal_error")
         # Exit with a failure code.
         sys.exit(1)
-        
     finally:
-        # This block will run no matter what happens (success or failure).
-        if driver:
-            # If the driver was successfully created, ensure it's closed to free up resources.
-            print("\nClosing browser session.")
-            driver.quit()
+        snapshots.drain()
+        selector_resolver.save()
+        # Keep the buffered failure frames only when the run did not end the way we wanted.
+        if outcome in ("booked", "batch_ok", "accounts_ok"):
+            diagnostics.discard()
+        else:
+            diagnostics.flush()
+        tracing.finish_run(TRACE_FILE, outcome)
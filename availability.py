@@ -0,0 +1,211 @@
+# --- Availability Snapshots and Ranked Preferences ---
+# A single scan of the court list already sees every slot of the selected day. So instead of only
+# asking "is TARGET_TIME free?", the bot keeps the whole grid (court x time x free/taken) and picks
+# the best acceptable option from it, without any extra navigation. A day in config.json may list
+# several acceptable options, best first:
+#
+#   "Dinsdag": "20:30 - 21:30"                                           (one time, any court)
+#   "Dinsdag": ["20:30 - 21:30", "19:30 - 20:30"]                        (ranked times)
+#   "Dinsdag": [{"time": "20:30 - 21:30", "court": "P 3"}, "20:30 - 21:30"]   (a favourite court first)
+#
+# Every scan is also recorded in a small SQLite file: one row per snapshot, plus only the cells that
+# changed since the previous snapshot of that date. That keeps the history of when slots open and
+# close cheap to collect. The writes happen on a background thread, off the booking path.
+#
+# Review the recorded grids with:
+#   python availability.py [availability.db] [date]
+import argparse
+import datetime
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+
+
+def parse_preferences(value, court=None):
+    """Turns a config value into a ranked list of {"time", "court"} preferences.
+
+    `value` is a time string or a list of time strings and {"time": ..., "court": ...} objects.
+    With `court` (race mode, one browser per court) only the options that court can satisfy are
+    kept, pinned to it. Raises ValueError for a malformed value.
+    """
+    items = value if isinstance(value, list) else [value]
+    prefs = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"time": item}
+        if not isinstance(item, dict) or not isinstance(item.get("time"), str) or not item["time"].strip():
+            raise ValueError(f"Invalid time preference {item!r}; expected '20:30 - 21:30' or {{\"time\": ..., \"court\": ...}}.")
+        pref = {"time": " ".join(item["time"].split()), "court": item.get("court") or None}
+        if court is not None:
+            if pref["court"] not in (None, court):
+                continue
+            pref["court"] = court
+        if pref not in prefs:
+            prefs.append(pref)
+    if not prefs and court is None:
+        raise ValueError("No time preference given.")
+    return prefs
+
+
+def describe(value):
+    """Returns a short label for a config value, e.g. '20:30 - 21:30 (+2 fallbacks)'."""
+    prefs = parse_preferences(value)
+    first = prefs[0]["time"] + (f" on {prefs[0]['court']}" if prefs[0]["court"] else "")
+    return first + (f" (+{len(prefs) - 1} fallback{'s' if len(prefs) > 2 else ''})" if len(prefs) > 1 else "")
+
+
+def slots_from_payload(data):
+    """Flattens an availability response ({"courts": [{"name", "slots": [{"id", "time", "available"}]}]})
+    into the scan's slot records: {"court", "time", "clickable"} plus the slot's own fields."""
+    return [dict(slot, court=court.get("name"), time=" ".join(str(slot.get("time", "")).split()),
+                 clickable=bool(slot.get("available")))
+            for court in data.get("courts", []) for slot in court.get("slots", [])]
+
+
+def court_matches(slot_court, court):
+    """True if a listed court (e.g. "P 3 (Padel)") is the wanted court ("P 3"), or any court is fine."""
+    return court is None or (slot_court is not None and (slot_court == court or slot_court.startswith(court + " ")))
+
+
+def rank_free(slots, prefs):
+    """Returns (slot index, preference rank) for every free slot that satisfies a preference, best first."""
+    ranked, seen = [], set()
+    for rank, pref in enumerate(prefs):
+        for index, slot in enumerate(slots):
+            if (index not in seen and slot["clickable"] and slot["time"] == pref["time"]
+                    and court_matches(slot["court"], pref["court"])):
+                ranked.append((index, rank))
+                seen.add(index)
+    return ranked
+
+
+class SnapshotStore:
+    """Records availability grids in SQLite, keeping only the cells that changed between snapshots."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS snapshots (
+        id INTEGER PRIMARY KEY, date TEXT NOT NULL, day TEXT, taken_at REAL NOT NULL,
+        slots INTEGER NOT NULL, free INTEGER NOT NULL, changed INTEGER NOT NULL);
+    -- free is NULL when a slot is no longer listed at all.
+    CREATE TABLE IF NOT EXISTS changes (
+        snapshot_id INTEGER NOT NULL REFERENCES snapshots(id), court TEXT NOT NULL, time TEXT NOT NULL, free INTEGER);
+    -- The latest known state of every cell, so a new snapshot only has to be compared against this.
+    CREATE TABLE IF NOT EXISTS grid (
+        date TEXT NOT NULL, court TEXT NOT NULL, time TEXT NOT NULL, free INTEGER NOT NULL,
+        PRIMARY KEY (date, court, time));
+    CREATE INDEX IF NOT EXISTS snapshots_by_date ON snapshots (date, taken_at);
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self._ready = False
+
+    def _connect(self):
+        # A connection per write: several account processes may share the file, and SQLite locks it for them.
+        conn = sqlite3.connect(self.path, timeout=10)
+        if not self._ready:
+            conn.executescript(self.SCHEMA)
+            self._ready = True
+        return conn
+
+    def submit(self, date, day, slots):
+        """Queues one scan (the slots returned by the court list scan) for the background writer."""
+        if not self.path or not slots:
+            # An empty list means the day was not rendered (yet); there is nothing to learn from it.
+            return
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="snapshots", daemon=True)
+                self._worker.start()
+        self._queue.put((date, day, [dict(s) for s in slots], time.time()))
+
+    def _run(self):
+        while True:
+            date, day, slots, taken_at = self._queue.get()
+            try:
+                self.record(date, day, slots, taken_at)
+            except sqlite3.Error as e:
+                print(f"⚠️ Could not record availability snapshot: {e}")
+            finally:
+                self._queue.task_done()
+
+    def record(self, date, day, slots, taken_at=None):
+        """Stores one scan of `date` and returns the number of cells that changed since the previous one."""
+        cells = {(s["court"] or "", s["time"]): int(bool(s["clickable"])) for s in slots}
+        with closing(self._connect()) as conn, conn:
+            previous = {(court, slot_time): free for court, slot_time, free
+                        in conn.execute("SELECT court, time, free FROM grid WHERE date = ?", (date,))}
+            changed = [(court, slot_time, free) for (court, slot_time), free in cells.items()
+                       if previous.get((court, slot_time)) != free]
+            changed += [(court, slot_time, None) for (court, slot_time) in previous if (court, slot_time) not in cells]
+            snapshot_id = conn.execute(
+                "INSERT INTO snapshots (date, day, taken_at, slots, free, changed) VALUES (?, ?, ?, ?, ?, ?)",
+                (date, day, taken_at or time.time(), len(cells), sum(cells.values()), len(changed))).lastrowid
+            conn.executemany("INSERT INTO changes (snapshot_id, court, time, free) VALUES (?, ?, ?, ?)",
+                             [(snapshot_id, court, slot_time, free) for court, slot_time, free in changed])
+            conn.executemany("INSERT OR REPLACE INTO grid (date, court, time, free) VALUES (?, ?, ?, ?)",
+                             [(date, court, slot_time, free) for court, slot_time, free in changed if free is not None])
+            conn.executemany("DELETE FROM grid WHERE date = ? AND court = ? AND time = ?",
+                             [(date, court, slot_time) for court, slot_time, free in changed if free is None])
+        return len(changed)
+
+    def drain(self, timeout=10):
+        """Waits (up to `timeout` seconds) for the queued snapshots to be written."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.02)
+
+    def grid(self, date):
+        """Returns the latest known {(court, time): free} grid of a date."""
+        with closing(self._connect()) as conn:
+            return {(court, slot_time): bool(free) for court, slot_time, free
+                    in conn.execute("SELECT court, time, free FROM grid WHERE date = ?", (date,))}
+
+    def history(self, date, limit=20):
+        """Returns the latest snapshots of a date (newest first), each with the cells that changed."""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT id, taken_at, slots, free FROM snapshots WHERE date = ? AND changed > 0 "
+                                "ORDER BY taken_at DESC LIMIT ?", (date, limit)).fetchall()
+            return [{"taken_at": taken_at, "slots": slots, "free": free,
+                     "changes": conn.execute("SELECT court, time, free FROM changes WHERE snapshot_id = ? ORDER BY time, court",
+                                             (snapshot_id,)).fetchall()}
+                    for snapshot_id, taken_at, slots, free in rows]
+
+    def dates(self):
+        with closing(self._connect()) as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT date FROM grid ORDER BY date")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the recorded court availability and how it changed.")
+    parser.add_argument("path", nargs="?", default="availability.db")
+    parser.add_argument("date", nargs="?", help="YYYY-MM-DD (default: every recorded date)")
+    args = parser.parse_args(argv)
+    store = SnapshotStore(args.path)
+    dates = [args.date] if args.date else store.dates()
+    if not dates:
+        print(f"No availability recorded in {args.path}.")
+        return
+    for date in dates:
+        grid = store.grid(date)
+        courts = sorted({court for court, _ in grid})
+        print(f"\n{date}  (✓ free, · taken)")
+        print(" " * 15 + "".join(f"{court[:8]:>9}" for court in courts))
+        for slot_time in sorted({slot_time for _, slot_time in grid}):
+            marks = ["" if (court, slot_time) not in grid else "✓" if grid[(court, slot_time)] else "·" for court in courts]
+            print(f"{slot_time:<15}" + "".join(f"{mark:>9}" for mark in marks))
+        for snapshot in reversed(store.history(date, limit=10)):
+            at = datetime.datetime.fromtimestamp(snapshot["taken_at"]).strftime("%Y-%m-%d %H:%M:%S")
+            changes = ", ".join(f"{court} {slot_time} {'free' if free else 'taken' if free == 0 else 'gone'}"
+                                for court, slot_time, free in snapshot["changes"][:6])
+            more = f" (+{len(snapshot['changes']) - 6} more)" if len(snapshot["changes"]) > 6 else ""
+            print(f"  {at}  {snapshot['free']}/{snapshot['slots']} free  {changes}{more}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+# --- Local Benchmarks ---
+# Timing comparisons for the bot's hot path, run against the local stand-in site (mock_site.py).
+# Correctness (the HTTP engine's error paths, retry scheduling, preferences and snapshots) is covered
+# by the tests instead: python -m pytest tests
+#
+# Usage:
+#   python bench.py scan [--rounds 20] [--courts 8]
+#   python bench.py http [--rounds 20] [--latency-ms 30]
+#   python bench.py waits [--rounds 20]
+#   python bench.py e2e [--runs 3] [--scenario open latency ...] [--baseline bench_baseline.json [--update-baseline]]
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import dom_waits
+import http_engine
+import mock_site
+import tracing
+
+BOT_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Book a Court.py")
+
+
+def load_bot(base_url, target_day, target_time):
+    """Imports 'Book a Court.py' as a module, configured for the given stand-in site and slot."""
+    # The bot reads its settings from the environment at import time.
+    os.environ.update({"BASE_URL": base_url, "TARGET_DAY": target_day, "TARGET_TIME": target_time,
+                       "EMAIL": os.getenv("EMAIL") or "bench@example.com", "PASSWORD": os.getenv("PASSWORD") or "bench"})
+    spec = importlib.util.spec_from_file_location("book_a_court", BOT_SCRIPT)
+    bot = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(bot)
+    return bot
+
+
+def tomorrow_day_name(offset=0):
+    """Returns the Dutch name of tomorrow (or `offset` days later), which the stand-in's day picker always lists."""
+    return mock_site.DAY_NAMES[(datetime.date.today() + datetime.timedelta(days=1 + offset)).weekday()]
+
+
+def launch_browser(bot):
+    """Launches a browser exactly the way the bot does (same cache, profile and blocking settings)."""
+    return bot.create_driver()
+
+
+def summarize(label, samples):
+    """Prints and returns the median/p95/max of a list of durations in seconds."""
+    ordered = sorted(samples)
+    p95 = tracing.percentile(ordered, 0.95)
+    stats = {"median_ms": statistics.median(ordered) * 1000, "p95_ms": p95 * 1000, "max_ms": ordered[-1] * 1000}
+    print(f"  {label:<28} median {stats['median_ms']:8.1f} ms   p95 {stats['p95_ms']:8.1f} ms   max {stats['max_ms']:8.1f} ms")
+    return stats
+
+
+# --- Slot Scan: per-element XPath calls vs. one execute_script ---
+def legacy_scan(driver, target_time):
+    """The pre-scan-script approach: one WebDriver round trip per accordion, span and ancestor lookup."""
+    from selenium.webdriver.common.by import By
+    accordions = driver.find_elements(By.XPATH, "//button[contains(@class,'MuiAccordionSummary-root')]")
+    closed = [b for b in accordions if "P " in b.text and b.get_attribute("aria-expanded") == "false"]
+    candidates = []
+    for span in driver.find_elements(By.XPATH, f"//span[normalize-space()='{target_time}']"):
+        container = span.find_element(By.XPATH, "./ancestor::div[contains(@class,'css-uu7ccs')]")
+        radio = container.find_elements(By.XPATH, ".//input[@type='radio']")
+        candidates.append(radio[0] if radio else container)
+    return closed, candidates
+
+
+def bench_scan(args):
+    club = mock_site.MockClub(courts=args.courts)
+    server, base_url = mock_site.start_server(club)
+    target_time = mock_site.DEFAULT_TIMES[1]
+    bot = load_bot(base_url, tomorrow_day_name(), target_time)
+    driver = launch_browser(bot)
+    try:
+        bot.login_and_navigate_to_courts(driver, bot.WAIT_SECONDS)
+        # Expand everything once so both approaches look at the same, fully rendered list.
+        bot.scan_slots(driver, target_time, allow_clicks=True)
+        legacy, scripted = [], []
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            legacy_scan(driver, target_time)
+            legacy.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            bot.scan_slots(driver, target_time)
+            scripted.append(time.perf_counter() - started)
+        print(f"\nSlot scan over {args.courts} courts x {len(mock_site.DEFAULT_TIMES)} times, {args.rounds} rounds:")
+        before = summarize("per-element XPath (before)", legacy)
+        after = summarize("single execute_script (after)", scripted)
+        print(f"  speed-up: {before['median_ms'] / after['median_ms']:.1f}x")
+    finally:
+        driver.quit()
+        server.shutdown()
+
+
+# --- HTTP engine: full booking against the stand-in's JSON endpoints ---
+def bench_http(args):
+    club = mock_site.MockClub(courts=args.courts, latency_ms=args.latency_ms)
+    server, base_url = mock_site.start_server(club)
+    # Authenticate the way a cached browser session would: with the site's session cookie.
+    token = "bench-session"
+    club.sessions.add(token)
+    record = {"cookies": [{"name": "mock_session", "value": token, "domain": "127.0.0.1", "path": "/"}]}
+    durations = []
+    try:
+        for _ in range(args.rounds):
+            club.bookings.clear()
+            backend = http_engine.HttpBackend(base_url + "api", record, attempts=1)
+            started = time.perf_counter()
+            booked = backend.book(tomorrow_day_name(), mock_site.DEFAULT_TIMES[1], mock_site.DEFAULT_PLAYERS[:3])
+            durations.append(time.perf_counter() - started)
+            backend.close()
+            if not booked or len(club.bookings) != 1:
+                raise SystemExit(f"❌ HTTP engine did not make exactly one booking: {club.bookings}")
+        print(f"\nHTTP engine booking with {args.latency_ms} ms API latency, {args.rounds} rounds:")
+        summarize("players + availability + reserve", durations)
+    finally:
+        server.shutdown()
+
+
+# --- Waits: WebDriverWait polling vs. in-page MutationObserver ---
+# Schedules a button to appear after a random delay, then measures how long after its appearance each wait returns.
+SCHEDULE_LATE_BUTTON_JS = """
+const old = document.getElementById('late'); if (old) old.remove();
+setTimeout(() => { const b = document.createElement('button'); b.id = 'late'; b.textContent = 'late'; document.body.appendChild(b); }, arguments[0]);
+"""
+
+
+def bench_waits(args):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+    club = mock_site.MockClub()
+    server, base_url = mock_site.start_server(club)
+    bot = load_bot(base_url, tomorrow_day_name(), mock_site.DEFAULT_TIMES[1])
+    driver = launch_browser(bot)
+    xpath = "//button[@id='late']"
+    approaches = {
+        "WebDriverWait, 500 ms poll": lambda: WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.XPATH, xpath))),
+        "MutationObserver wait": lambda: dom_waits.wait_clickable(driver, xpath, 5),
+    }
+    overshoot = {label: [] for label in approaches}
+    try:
+        driver.get(base_url + "app")
+        for _ in range(args.rounds):
+            delay = random.uniform(0.05, 0.4)
+            for label, wait in approaches.items():
+                driver.execute_script(SCHEDULE_LATE_BUTTON_JS, int(delay * 1000))
+                started = time.perf_counter()
+                wait()
+                # Time spent waiting after the button had already appeared.
+                overshoot[label].append(max(0.0, time.perf_counter() - started - delay))
+        print(f"\nLatency between an element appearing and the wait returning, {args.rounds} rounds:")
+        before = summarize("WebDriverWait (before)", overshoot["WebDriverWait, 500 ms poll"])
+        after = summarize("MutationObserver (after)", overshoot["MutationObserver wait"])
+        print(f"  saved per wait: {before['median_ms'] - after['median_ms']:.0f} ms (median)")
+    finally:
+        driver.quit()
+        server.shutdown()
+
+
+# --- End to end: the whole bot, start to confirmed booking, under failure scenarios ---
+# Each scenario configures the stand-in site; "release_in" arms the bot (RELEASE_AT) that many seconds
+# after launch, and its runs are scored from the release moment instead of from process start. "env"
+# adds environment variables for the bot itself, and "days" runs batch mode for that many consecutive
+# days (from tomorrow) in one session, scored up to the last booking.
+E2E_SCENARIOS = {
+    "open": {},
+    "latency": {"latency_ms": 150, "page_latency_ms": 100},
+    "backdrops": {"backdrop_ms": 600, "backdrop_chance": 1.0},
+    "intercepted": {"intercept_ms": 1500},
+    "release": {"release_in": 25},
+    "logout": {"release_in": 25, "logout_after": 1},
+    # The same runs with the slot read from the availability response (CDP) instead of the rendered list.
+    "network": {"latency_ms": 150, "page_latency_ms": 100, "env": {"CDP_SLOT_DETECTION": "1"}},
+    "network_release": {"release_in": 25, "env": {"CDP_SLOT_DETECTION": "1"}},
+    "batch": {"days": 2},
+}
+
+
+def run_bot_once(scenario, settings, timeout):
+    """Runs the bot as a subprocess against a fresh stand-in site; returns a result dict for the run."""
+    settings = dict(settings)
+    release_in = settings.pop("release_in", None)
+    bot_env = settings.pop("env", {})
+    days = settings.pop("days", None)
+    club = mock_site.MockClub(**settings)
+    server, base_url = mock_site.start_server(club)
+    target_time = mock_site.DEFAULT_TIMES[1]
+    with tempfile.TemporaryDirectory(prefix="bench_e2e_") as workdir:
+        trace_file = os.path.join(workdir, "trace.jsonl")
+        env = dict(os.environ, BASE_URL=base_url, TARGET_DAY=tomorrow_day_name(), TARGET_TIME=target_time,
+                   EMAIL="bench@example.com", PASSWORD="bench", RUN_MODE="single", BOOKING_ENGINE="selenium",
+                   SESSION_CACHE="0", TRACE_FILE=trace_file, PYTHONUNBUFFERED="1")
+        env.pop("RELEASE_AT", None)
+        if days:
+            # Batch mode: one session books every day of the config, switching days in the date picker.
+            config_file = os.path.join(workdir, "config.json")
+            with open(config_file, "w", encoding="utf-8") as f:
+                json.dump({tomorrow_day_name(offset): target_time for offset in range(days)}, f)
+            env.update(RUN_MODE="batch", CONFIG_FILE=config_file)
+        env.update(bot_env)
+        started = time.time()
+        if release_in is not None:
+            club.release_at = club.now() + release_in
+            env["RELEASE_AT"] = f"{club.release_at:.3f}"
+        try:
+            # Run from a scratch directory so screenshots and traces do not land in the checkout.
+            process = subprocess.run([sys.executable, "-u", BOT_SCRIPT], cwd=workdir, env=env, timeout=timeout,
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+            exit_code, output = process.returncode, process.stdout
+        except subprocess.TimeoutExpired as e:
+            exit_code, output = None, e.stdout.decode() if isinstance(e.stdout, bytes) else (e.stdout or "")
+        finally:
+            server.shutdown()
+        runs = tracing.load_runs([trace_file]) if os.path.exists(trace_file) else []
+    bookings = list(club.bookings.values())
+    result = {"scenario": scenario, "exit_code": exit_code, "bookings": len(bookings), "trace": runs[-1] if runs else None}
+    if len(bookings) == (days or 1) and exit_code == 0:
+        # The stand-in stamps bookings with its own clock; convert back to this machine's clock.
+        last_at = max(booking["at"] for booking in bookings)
+        result["start_to_booked"] = last_at - club.clock_skew - started
+        if club.release_at is not None:
+            result["release_to_booked"] = last_at - club.release_at
+    else:
+        result["output_tail"] = "\n".join(output.splitlines()[-15:])
+    return result
+
+
+def scenario_score(results):
+    """The metric a scenario is compared on: median seconds from release (armed) or from start to booking."""
+    key = "release_to_booked" if "release_to_booked" in results[0] else "start_to_booked"
+    return key, statistics.median(r[key] for r in results)
+
+
+def bench_e2e(args):
+    scenarios = args.scenario or list(E2E_SCENARIOS)
+    unknown = [name for name in scenarios if name not in E2E_SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}. Choose from: {', '.join(E2E_SCENARIOS)}")
+    baseline = {}
+    if args.baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    scores, failures, regressions = {}, [], []
+    for name in scenarios:
+        print(f"\n▶️ Scenario '{name}': {E2E_SCENARIOS[name] or 'no failures injected'}")
+        results = []
+        for n in range(args.runs):
+            result = run_bot_once(name, E2E_SCENARIOS[name], args.timeout)
+            if "start_to_booked" not in result:
+                print(f"  ❌ run {n + 1}: exit code {result['exit_code']}, {result['bookings']} booking(s)\n{result['output_tail']}")
+                failures.append(name)
+                break
+            print(f"  - run {n + 1}: booked {result['start_to_booked']:.2f}s after start"
+                  + (f", {result['release_to_booked'] * 1000:.0f} ms after release" if "release_to_booked" in result else ""))
+            results.append(result)
+        if not results or name in failures:
+            continue
+        key, score = scenario_score(results)
+        scores[name] = {"metric": key, "median_s": round(score, 3)}
+        summarize(f"{name} ({key})", [r[key] for r in results])
+        phases = tracing.summarize_runs([r["trace"] for r in results if r["trace"]])
+        slowest = sorted(((p, s["p50"]) for p, s in phases.items() if p != "total"), key=lambda item: -item[1])[:4]
+        if slowest:
+            print("    slowest phases (p50): " + ", ".join(f"{p} {ms:.0f} ms" for p, ms in slowest))
+        previous = baseline.get(name)
+        if previous and previous["metric"] == key:
+            change = score / previous["median_s"] - 1 if previous["median_s"] else 0.0
+            print(f"    vs. baseline {previous['median_s']:.3f}s: {change:+.0%}")
+            if change > args.max_regression:
+                regressions.append(f"{name} {change:+.0%}")
+    if args.baseline and args.update_baseline and not failures:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(dict(baseline, **scores), f, indent=2, sort_keys=True)
+        print(f"\n💾 Baseline written to {args.baseline}")
+    if failures or regressions:
+        raise SystemExit(f"\n❌ End-to-end benchmark failed. Failed: {', '.join(failures) or 'none'}. "
+                         f"Regressed beyond {args.max_regression:.0%}: {', '.join(regressions) or 'none'}.")
+    print("\n✅ All scenarios booked" + (" within the baseline." if baseline else "."))
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the booking bot against the local stand-in site.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    scan = commands.add_parser("scan", help="Compare the per-element slot scan with the single-script scan.")
+    scan.add_argument("--rounds", type=int, default=20)
+    scan.add_argument("--courts", type=int, default=8)
+    scan.set_defaults(func=bench_scan)
+    http = commands.add_parser("http", help="Book through the HTTP engine against the stand-in's JSON endpoints.")
+    http.add_argument("--rounds", type=int, default=20)
+    http.add_argument("--courts", type=int, default=4)
+    http.add_argument("--latency-ms", type=int, default=30)
+    http.set_defaults(func=bench_http)
+    waits = commands.add_parser("waits", help="Compare polling waits with the event-driven waits.")
+    waits.add_argument("--rounds", type=int, default=20)
+    waits.set_defaults(func=bench_waits)
+    e2e = commands.add_parser("e2e", help="Run the whole bot against failure scenarios and time start-to-booking.")
+    e2e.add_argument("--runs", type=int, default=3, help="Bot runs per scenario (the median is scored).")
+    e2e.add_argument("--scenario", nargs="+", help=f"Scenarios to run (default: all of {', '.join(E2E_SCENARIOS)}).")
+    e2e.add_argument("--timeout", type=float, default=240, help="Seconds before a single bot run is killed.")
+    e2e.add_argument("--baseline", help="JSON file with per-scenario medians to compare against.")
+    e2e.add_argument("--update-baseline", action="store_true", help="Write this run's medians to --baseline.")
+    e2e.add_argument("--max-regression", type=float, default=0.2, help="Allowed slowdown against the baseline (0.2 = 20%%).")
+    e2e.set_defaults(func=bench_e2e)
+    return parser
+
+
+if __name__ == "__main__":
+    arguments = build_arg_parser().parse_args()
+    arguments.func(arguments)
@@ -0,0 +1,364 @@
+# --- Booking Daemon ---
+# A long-running mode that keeps a few logged-in browsers warm and books on request, instead of
+# paying for a cold start (dependencies, Chrome launch, login) at every release. It is made of:
+#   - SessionPool: a bounded pool of warm sessions with periodic health checks; unhealthy sessions
+#     are disposed of and replaced.
+#   - JobScheduler: holds booking jobs and starts each one on a pooled session `lead_seconds` before
+#     its release moment (or straight away when it has none).
+#   - A small JSON API on localhost to submit, list and cancel jobs.
+# The module knows nothing about browsers: creating, checking and disposing of a session and running
+# a job are callables supplied by "Book a Court.py".
+#
+# API (optionally protected with "Authorization: Bearer <token>"):
+#   GET    /health        -> {"status", "pool": {...}, "jobs": {status: count}}
+#   GET    /jobs          -> {"jobs": [...]}
+#   GET    /jobs/<id>     -> job
+#   POST   /jobs          <- {"day", "time", "players"?, "release_at"?}; 201 job
+#   DELETE /jobs/<id>     -> cancels a job that has not started yet
+import json
+import signal
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class PoolClosed(Exception):
+    """Raised when a session is requested from a pool that is shutting down."""
+
+
+class SessionPool:
+    """A bounded pool of warm sessions created, checked and disposed of through injected callables."""
+
+    def __init__(self, create, check, dispose, size=2):
+        self._create, self._check, self._dispose = create, check, dispose
+        self.size = max(1, size)
+        self._idle = []
+        self._busy = []
+        # Sessions that exist or are being created; never more than `size`.
+        self._count = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def stats(self):
+        with self._cond:
+            return {"size": self.size, "alive": self._count, "idle": len(self._idle), "busy": len(self._busy)}
+
+    def _new_session(self):
+        """Creates a session for a slot already reserved in `_count`; frees the slot if creation fails."""
+        try:
+            return self._create()
+        except Exception:
+            with self._cond:
+                self._count -= 1
+                self._cond.notify_all()
+            raise
+
+    def warm(self):
+        """Creates sessions until the pool is full (one at a time; browser launches are serialized anyway)."""
+        while True:
+            with self._cond:
+                if self._closed or self._count >= self.size:
+                    return
+                self._count += 1
+            try:
+                session = self._new_session()
+            except Exception as e:
+                print(f"⚠️ Could not warm up a session: {e}")
+                return
+            self._put_idle(session)
+
+    def _put_idle(self, session):
+        with self._cond:
+            if not self._closed:
+                self._idle.append(session)
+                self._cond.notify_all()
+                return
+            self._count -= 1
+        self._safe_dispose(session)
+
+    def acquire(self, timeout=None):
+        """Returns an idle session, creating one if the pool is not full, or waits for one to be released."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise PoolClosed("The session pool is shutting down.")
+                if self._idle:
+                    session = self._idle.pop()
+                    self._busy.append(session)
+                    return session
+                if self._count < self.size:
+                    self._count += 1
+                    break
+                remaining = None if deadline is None else deadline - time.time()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError("No session became available in time.")
+                self._cond.wait(remaining)
+        session = self._new_session()
+        with self._cond:
+            self._busy.append(session)
+        return session
+
+    def release(self, session, healthy=True):
+        """Returns a session to the pool, or disposes of it (and frees its slot) if it is unhealthy."""
+        with self._cond:
+            self._busy = [s for s in self._busy if s is not session]
+            if healthy and not self._closed:
+                self._idle.append(session)
+                self._cond.notify_all()
+                return
+            self._count -= 1
+            self._cond.notify_all()
+        self._safe_dispose(session)
+
+    def health_check(self):
+        """Checks every idle session, replaces the unhealthy ones and tops the pool back up."""
+        with self._cond:
+            sessions, self._idle = self._idle, []
+            self._busy += sessions
+        for session in sessions:
+            try:
+                healthy = bool(self._check(session))
+            except Exception as e:
+                print(f"⚠️ Health check crashed: {e}")
+                healthy = False
+            if not healthy:
+                print("♻️ Recycling an unhealthy session.")
+            self.release(session, healthy)
+        self.warm()
+
+    def _safe_dispose(self, session):
+        try:
+            self._dispose(session)
+        except Exception as e:
+            print(f"⚠️ Could not dispose of a session: {e}")
+
+    def close(self):
+        """Disposes of every session, including ones still in use, and refuses new requests."""
+        with self._cond:
+            self._closed = True
+            sessions = self._idle + self._busy
+            self._idle, self._busy, self._count = [], [], 0
+            self._cond.notify_all()
+        for session in sessions:
+            self._safe_dispose(session)
+
+
+class JobScheduler:
+    """Runs booking jobs on pooled sessions, each starting `lead_seconds` before its release moment."""
+
+    def __init__(self, pool, run_job, lead_seconds=60, parse_time=float):
+        self.pool = pool
+        # run_job(session, job) returns a final status ("booked", "no_slot", ...); raising marks the
+        # job as "error" and the session as unhealthy.
+        self.run_job = run_job
+        self.lead_seconds = lead_seconds
+        self.parse_time = parse_time
+        self.jobs = {}
+        self._threads = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._loop = None
+
+    def submit(self, day, slot_time, players=None, release_at=None):
+        """Adds a job and returns it; `release_at` is anything `parse_time` understands (or None)."""
+        release = self.parse_time(release_at) if release_at not in (None, "") else None
+        job = {"id": uuid.uuid4().hex[:12], "day": day, "time": slot_time, "players": players or None,
+               "release_at": release, "start_at": release - self.lead_seconds if release is not None else time.time(),
+               "status": "scheduled", "detail": "", "created_at": time.time(), "started_at": None, "finished_at": None}
+        with self._lock:
+            self.jobs[job["id"]] = job
+        print(f"📥 Job {job['id']}: {day} at {slot_time}" + (f", release at {release:.3f}" if release is not None else ", now"))
+        self._wakeup.set()
+        return job
+
+    def cancel(self, job_id):
+        """Cancels a job that has not started; returns False if it is unknown or already running."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if not job or job["status"] != "scheduled":
+                return False
+            job["status"] = "cancelled"
+            job["finished_at"] = time.time()
+        return True
+
+    def snapshot(self, job_id=None):
+        """Returns a copy of one job (or None), or of all jobs when no id is given."""
+        with self._lock:
+            if job_id is not None:
+                return dict(self.jobs[job_id]) if job_id in self.jobs else None
+            return [dict(job) for job in self.jobs.values()]
+
+    def start(self):
+        self._loop = threading.Thread(target=self._schedule, name="scheduler", daemon=True)
+        self._loop.start()
+
+    def _schedule(self):
+        while not self._stopping.is_set():
+            now = time.time()
+            with self._lock:
+                due = [job for job in self.jobs.values() if job["status"] == "scheduled" and job["start_at"] <= now]
+                for job in due:
+                    job["status"] = "starting"
+                upcoming = [job["start_at"] for job in self.jobs.values() if job["status"] == "scheduled"]
+            for job in due:
+                thread = threading.Thread(target=self._run, args=(job,), name=f"job-{job['id']}", daemon=True)
+                self._threads.append(thread)
+                thread.start()
+            # Sleep until the next job is due, a new job arrives, or a minute passes.
+            self._wakeup.wait(min([max(0.0, t - time.time()) for t in upcoming] + [60.0]))
+            self._wakeup.clear()
+
+    def _finish(self, job, status, detail=""):
+        with self._lock:
+            job.update(status=status, detail=detail, finished_at=time.time())
+        print(f"🏁 Job {job['id']} ({job['day']} at {job['time']}): {status}" + (f" ({detail})" if detail else ""))
+
+    def _run(self, job):
+        try:
+            session = self.pool.acquire()
+        except Exception as e:
+            self._finish(job, "error", f"No session: {e}")
+            return
+        with self._lock:
+            job.update(status="running", started_at=time.time())
+        try:
+            status = self.run_job(session, job)
+        except Exception as e:
+            self.pool.release(session, healthy=False)
+            self._finish(job, "error", str(e))
+            return
+        self.pool.release(session)
+        self._finish(job, status)
+
+    def counts(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+    def stop(self, grace=30):
+        """Stops scheduling, cancels jobs that have not started and waits up to `grace` seconds for running ones."""
+        self._stopping.set()
+        self._wakeup.set()
+        with self._lock:
+            for job in self.jobs.values():
+                if job["status"] == "scheduled":
+                    job.update(status="cancelled", detail="daemon shut down", finished_at=time.time())
+        deadline = time.time() + grace
+        for thread in self._threads:
+            thread.join(max(0.0, deadline - time.time()))
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    """The localhost JSON API of the daemon."""
+
+    protocol_version = "HTTP/1.1"
+    scheduler = None
+    token = None
+    validate = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, data):
+        payload = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _authorized(self):
+        if self.token and self.headers.get("Authorization") != f"Bearer {self.token}":
+            self._send_json(401, {"error": "unauthorized"})
+            return False
+        return True
+
+    def _job_id(self, path):
+        parts = path.strip("/").split("/")
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        path = urlsplit(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "pool": self.scheduler.pool.stats(), "jobs": self.scheduler.counts()})
+        elif path == "/jobs":
+            self._send_json(200, {"jobs": self.scheduler.snapshot()})
+        elif (job_id := self._job_id(path)) is not None:
+            job = self.scheduler.snapshot(job_id)
+            self._send_json(200 if job else 404, job or {"error": "unknown job"})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        if urlsplit(self.path).path != "/jobs":
+            self._send_json(404, {"error": "not found"})
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict):
+                raise ValueError("expected a JSON object")
+        except ValueError as e:
+            self._send_json(400, {"error": f"invalid JSON: {e}"})
+            return
+        error = self.validate(body) if self.validate else None
+        if error:
+            self._send_json(400, {"error": error})
+            return
+        try:
+            job = self.scheduler.submit(body["day"], body["time"], body.get("players"), body.get("release_at"))
+        except (TypeError, ValueError) as e:
+            self._send_json(400, {"error": f"invalid release_at: {e}"})
+            return
+        self._send_json(201, job)
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        job_id = self._job_id(urlsplit(self.path).path)
+        if job_id is None or self.scheduler.snapshot(job_id) is None:
+            self._send_json(404, {"error": "unknown job"})
+        elif self.scheduler.cancel(job_id):
+            self._send_json(200, self.scheduler.snapshot(job_id))
+        else:
+            self._send_json(409, {"error": "job already started"})
+
+
+def serve_api(scheduler, host="127.0.0.1", port=8787, token=None, validate=None):
+    """Starts the job API in a background thread and returns the server."""
+    handler = type("BoundDaemonHandler", (DaemonHandler,), {"scheduler": scheduler, "token": token, "validate": staticmethod(validate) if validate else None})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="api", daemon=True).start()
+    return server
+
+
+def run(pool, scheduler, host="127.0.0.1", port=8787, token=None, validate=None, health_seconds=60, shutdown_grace=30):
+    """Runs the daemon until SIGINT/SIGTERM, then shuts down gracefully. Must be called from the main thread."""
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda signum, frame: stop.set())
+    server = serve_api(scheduler, host, port, token, validate)
+    print(f"🛰️ Booking daemon listening on http://{host}:{server.server_address[1]}/ (pool of {pool.size}).")
+    scheduler.start()
+    try:
+        pool.warm()
+        print(f"🔥 {pool.stats()['idle']} warm session(s) ready.")
+        while not stop.wait(health_seconds):
+            pool.health_check()
+    finally:
+        print("🛑 Shutting down: no new jobs, waiting for running ones...")
+        server.shutdown()
+        scheduler.stop(shutdown_grace)
+        pool.close()
+        print("👋 Daemon stopped; every browser has been closed.")
@@ -0,0 +1,151 @@
+# --- Non-Blocking Diagnostics ---
+# Failure screenshots used to be written synchronously, right inside the retry loop, so every failed
+# attempt paid for PNG decoding and a disk write and left another near-identical file behind.
+# Here the hot path only grabs the frame (one WebDriver call) and queues it. The DOM is fetched too
+# (if enabled), but not for a buffered frame that repeats the previous one with the same label, so a
+# retry loop failing on an unchanged page costs one round trip per attempt. A background worker
+# decodes the frames, folds such repeats into the earlier frame, and keeps the last N in a ring buffer. The buffer is written out only if the run finally
+# fails; frames that are wanted either way (success, fatal errors) are written straight away.
+import base64
+import datetime
+import hashlib
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import tracing
+
+
+class Diagnostics:
+    """Captures screenshots and DOM snapshots cheaply and writes them to disk in the background."""
+
+    def __init__(self, capacity=8, out_dir=".", capture_dom=True, name_prefix=""):
+        self.out_dir = out_dir
+        # Prepended to every filename, e.g. the account name when several accounts run side by side.
+        self.name_prefix = name_prefix
+        self.capture_dom = capture_dom
+        # The last `capacity` distinct frames; older ones fall out as new ones arrive.
+        self.buffer = deque(maxlen=capacity)
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._last = {}
+        # Digest of the last screenshot taken per label, checked in the caller's thread before fetching the DOM.
+        self._last_digest = {}
+        self._worker = None
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run, name="diagnostics", daemon=True)
+                self._worker.start()
+
+    def capture(self, driver, prefix, persist=False):
+        """Grabs a frame in the calling thread and hands the rest to the worker.
+
+        Frames are kept in the ring buffer unless `persist` is set, in which case they are written
+        out right away. Returns the base filename the frame is (or would be) written under.
+        """
+        name = f"{self.name_prefix}{prefix}_{datetime.datetime.now():%Y%m%d_%H%M%S}"
+        with tracing.span("diagnostics", label=prefix) as record:
+            try:
+                # WebDriver is not thread-safe, so the browser round trips stay in the caller's thread.
+                png_b64 = driver.get_screenshot_as_base64()
+                # Hashing the base64 text is as good as hashing the PNG, and needs no decoding here.
+                digest = hashlib.sha1(png_b64.encode("ascii")).hexdigest()
+                with self._lock:
+                    repeat = not persist and self._last_digest.get(prefix) == digest
+                    self._last_digest[prefix] = digest
+                # The same picture under the same label is a repeat; its DOM would not tell anything new.
+                html = driver.page_source if self.capture_dom and not repeat else None
+                record["repeat"] = repeat
+            except Exception as e:
+                record["status"] = "failed"
+                print(f"⚠️ Could not capture diagnostics: {e}")
+                return None
+        self._ensure_worker()
+        self._queue.put({"name": name, "prefix": prefix, "at": time.time(), "png_b64": png_b64, "digest": digest,
+                         "html": html, "persist": persist})
+        return name
+
+    def _run(self):
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                # close() asked the worker to stop; a later capture starts a new one.
+                self._queue.task_done()
+                return
+            try:
+                self._process(frame)
+            except Exception as e:
+                print(f"⚠️ Diagnostics worker failed on {frame['name']}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _process(self, frame):
+        frame["png"] = base64.b64decode(frame.pop("png_b64"))
+        if frame["persist"]:
+            self._write(frame)
+            return
+        digest = frame["digest"]
+        with self._lock:
+            previous = self._last.get(frame["prefix"])
+            if previous is not None and previous["digest"] == digest and any(f is previous for f in self.buffer):
+                # Same label, same picture: count the repeat instead of storing another copy.
+                previous["repeats"] += 1
+                previous["last_at"] = frame["at"]
+                return
+            frame.update(digest=digest, repeats=1, last_at=frame["at"])
+            self.buffer.append(frame)
+            self._last[frame["prefix"]] = frame
+
+    def _write(self, frame):
+        """Writes one frame as <name>.png (plus <name>.html) and returns the PNG path."""
+        base = os.path.join(self.out_dir, frame["name"])
+        path, n = base, 1
+        while os.path.exists(path + ".png"):
+            n += 1
+            path = f"{base}-{n}"
+        with open(path + ".png", "wb") as f:
+            f.write(frame["png"])
+        if frame.get("html") is not None:
+            with open(path + ".html", "w", encoding="utf-8") as f:
+                f.write(frame["html"])
+        repeats = f" (seen {frame['repeats']}x)" if frame.get("repeats", 1) > 1 else ""
+        print(f"📸 Saved screenshot: {path}.png{repeats}")
+        return path + ".png"
+
+    def drain(self, timeout=10):
+        """Waits (up to `timeout` seconds) for the worker to finish the queued frames."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.02)
+
+    def flush(self):
+        """Writes the buffered frames to disk (oldest first) after a failed run and empties the buffer."""
+        self.drain()
+        with self._lock:
+            frames = list(self.buffer)
+            self.buffer.clear()
+            self._last.clear()
+            self._last_digest.clear()
+        if frames:
+            print(f"🗂️ Writing the last {len(frames)} diagnostic frame(s)...")
+        return [self._write(frame) for frame in frames]
+
+    def close(self):
+        """Stops the background worker once the queued frames are done (for short-lived instances)."""
+        with self._lock:
+            worker = self._worker
+        if worker is not None and worker.is_alive():
+            self._queue.put(None)
+            worker.join(10)
+
+    def discard(self):
+        """Drops the buffered frames after a successful run (persisted frames are still written)."""
+        self.drain()
+        with self._lock:
+            self.buffer.clear()
+            self._last.clear()
+            self._last_digest.clear()
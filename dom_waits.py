@@ -0,0 +1,216 @@
+# --- Event-Driven Waits ---
+# WebDriverWait polls the browser every 500 ms, so each wait in the click path costs up to half a
+# second after the page is already ready. The helpers here run one asynchronous script in the page
+# instead: it checks the condition, then re-checks on every DOM mutation (MutationObserver) and
+# resolves the moment the condition holds. Each helper keeps a per-wait timeout and falls back to a
+# classic WebDriverWait if the script cannot run (e.g. the document unloads while waiting).
+import time
+
+from selenium.common.exceptions import (JavascriptException, StaleElementReferenceException, TimeoutException,
+                                        WebDriverException)
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+# The asynchronous wait. __PREDICATE__ is replaced with a function body that receives `arg` and
+# returns a truthy value once the condition holds. Mutations trigger an immediate re-check; a short
+# interval catches changes no mutation reports (CSS transitions, readyState, layout).
+WAIT_SCRIPT_TEMPLATE = r"""
+const arg = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+const byXPath = (xpath) => document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const isShown = (el) => {
+  if (!el || !el.isConnected) return false;
+  const style = getComputedStyle(el);
+  return el.getClientRects().length > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+};
+// False when another element (an overlay, a toast) sits on top of the element's centre, which is where
+// a native click lands. Elements outside the viewport are given the benefit of the doubt.
+const isUncovered = (el) => {
+  const r = el.getBoundingClientRect(), x = r.left + r.width / 2, y = r.top + r.height / 2;
+  if (x < 0 || y < 0 || x >= innerWidth || y >= innerHeight) return true;
+  const top = document.elementFromPoint(x, y);
+  return !top || el.contains(top) || top.contains(el);
+};
+const predicate = (arg) => { __PREDICATE__ };
+const check = () => { try { return predicate(arg); } catch (e) { return null; } };
+const first = check();
+if (first) { done(first); return; }
+let finished = false, observer = null, interval = null, timer = null;
+const finish = (value) => {
+  if (finished) return;
+  finished = true;
+  if (observer) observer.disconnect();
+  clearInterval(interval); clearTimeout(timer);
+  document.removeEventListener('readystatechange', onEvent);
+  window.removeEventListener('load', onEvent);
+  done(value);
+};
+const onEvent = () => { const value = check(); if (value) finish(value); };
+observer = new MutationObserver(onEvent);
+observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+document.addEventListener('readystatechange', onEvent);
+window.addEventListener('load', onEvent);
+interval = setInterval(onEvent, 50);
+timer = setTimeout(() => finish(check() || null), timeoutMs);
+"""
+
+# What a predicate returns for an element that was removed from the page (e.g. by a re-render): waiting
+# for it can never succeed, so wait_for raises StaleElementReferenceException right away instead.
+STALE = "__stale__"
+
+# --- Predicates (function bodies receiving `arg`; `isShown`, `isUncovered` and `byXPath` are in scope) ---
+PREDICATES = {
+    "ready": "return (arg ? document.readyState !== 'loading' : document.readyState === 'complete') && !!document.body;",
+    "present": "return byXPath(arg);",
+    "visible": "const node = byXPath(arg); return isShown(node) ? node : null;",
+    "clickable": "const node = byXPath(arg); return isShown(node) && !node.disabled && isUncovered(node) ? node : null;",
+    "element_clickable": "if (!arg.isConnected) return '__stale__'; return isShown(arg) && !arg.disabled && isUncovered(arg) ? arg : null;",
+    # `arg` is a list of time texts; any one of them being listed is enough.
+    "slot_listed": "return Array.from(document.querySelectorAll(\"div[class*='css-uu7ccs'] span\")).some((sp) => arg.includes(sp.textContent.replace(/\\s+/g, ' ').trim()));",
+    # `arg` is a list of {time, court} preferences; holds once a listed slot satisfying one of them is free.
+    "slot_free": ("const norm = (t) => (t || '').replace(/\\s+/g, ' ').trim();"
+                  " return Array.from(document.querySelectorAll(\"div[class*='css-uu7ccs']\")).some((box) => {"
+                  " const timeSpan = Array.from(box.querySelectorAll('span')).find((sp) => /\\d{1,2}:\\d{2}\\s*-\\s*\\d{1,2}:\\d{2}/.test(sp.textContent));"
+                  " const accordion = box.closest(\"[class*='MuiAccordion-root']\");"
+                  " const summary = accordion && accordion.querySelector(\"[class*='MuiAccordionSummary-root']\");"
+                  " const court = summary ? norm(summary.innerText) : null, time = norm(timeSpan ? timeSpan.textContent : box.textContent);"
+                  " const radio = box.querySelector(\"input[type='radio']\");"
+                  " const free = !(radio && radio.disabled) && !box.classList.contains('Mui-disabled') && box.getAttribute('aria-disabled') !== 'true';"
+                  " return free && arg.some((pref) => time === pref.time && (!pref.court || (court && (court === pref.court || court.startsWith(pref.court + ' ')))));"
+                  " });"),
+    # `arg` is a list of [kind, path] candidates ('css' or 'xpath'), all checked in the same pass.
+    "first_match": "const hits = arg.map(([kind, path]) => { try { const node = kind === 'css' ? document.querySelector(path) : byXPath(path); return isShown(node) ? node : null; } catch (e) { return null; } }); const index = hits.findIndex((node) => node); return index < 0 ? null : {index: index, element: hits[index], matched: hits.map((node) => !!node)};",
+    "backdrop_gone": "return !Array.from(document.getElementsByClassName('MuiBackdrop-root')).some((el) => isShown(el) && getComputedStyle(el).opacity !== '0');",
+}
+
+# Resolves once the DOM has gone `quietMs` without a mutation (the app has finished re-rendering after
+# a click), or at the timeout; returns whether it settled.
+SETTLE_SCRIPT = r"""
+const quietMs = arguments[0], timeoutMs = arguments[1], done = arguments[arguments.length - 1];
+let quietTimer = null;
+const finish = (settled) => { observer.disconnect(); clearTimeout(quietTimer); clearTimeout(timer); done(settled); };
+const observer = new MutationObserver(() => { clearTimeout(quietTimer); quietTimer = setTimeout(() => finish(true), quietMs); });
+observer.observe(document, {subtree: true, childList: true, attributes: true, characterData: true});
+quietTimer = setTimeout(() => finish(true), quietMs);
+const timer = setTimeout(() => finish(false), timeoutMs);
+"""
+
+# Scrolls an element into view, waits one animation frame for layout, then clicks it (one round trip).
+SCROLL_AND_CLICK_JS = r"""
+const el = arguments[0], done = arguments[arguments.length - 1];
+el.scrollIntoView({block: 'center', inline: 'nearest'});
+requestAnimationFrame(() => { el.click(); done(true); });
+"""
+
+
+def _ensure_script_timeout(driver, timeout):
+    """Raises the driver's async-script timeout if needed (remembered per driver to save round trips)."""
+    needed = timeout + 2
+    if getattr(driver, "_dom_waits_script_timeout", 0) < needed:
+        driver.set_script_timeout(needed)
+        driver._dom_waits_script_timeout = needed
+
+
+def wait_for(driver, predicate, arg=None, timeout=10, fallback=None):
+    """Waits until the named predicate holds and returns its value.
+
+    Raises TimeoutException after `timeout` seconds, and StaleElementReferenceException as soon as an
+    element being waited for is detached from the page. If the in-page wait cannot run, the Selenium
+    `fallback` condition (if given) is polled with a regular WebDriverWait instead.
+    """
+    try:
+        _ensure_script_timeout(driver, timeout)
+        script = WAIT_SCRIPT_TEMPLATE.replace("__PREDICATE__", PREDICATES[predicate])
+        result = driver.execute_async_script(script, arg, int(timeout * 1000))
+    except TimeoutException:
+        result = None
+    except StaleElementReferenceException:
+        # The element was already gone when the wait started; no fallback can wait for it either.
+        raise
+    except (JavascriptException, WebDriverException) as e:
+        if fallback is None:
+            raise
+        print(f"    - Event-driven wait unavailable ({e.__class__.__name__}); polling instead.")
+        return WebDriverWait(driver, timeout).until(fallback)
+    if result == STALE:
+        raise StaleElementReferenceException(f"Element detached from the page while waiting for '{predicate}'.")
+    if not result:
+        raise TimeoutException(f"Condition '{predicate}' not met within {timeout}s.")
+    return result
+
+
+def wait_ready(driver, timeout=20, interactive=False):
+    """Waits for document.readyState 'complete' (or, with `interactive`, at least 'interactive') and a <body>."""
+    ready_states = ("interactive", "complete") if interactive else ("complete",)
+    return wait_for(driver, "ready", interactive, timeout,
+                    fallback=lambda d: d.execute_script("return document.readyState") in ready_states)
+
+
+def wait_present(driver, xpath, timeout=15):
+    """Waits for an element matching the XPath to exist and returns it."""
+    return wait_for(driver, "present", xpath, timeout, EC.presence_of_element_located((By.XPATH, xpath)))
+
+
+def wait_visible(driver, xpath, timeout=15):
+    """Waits for an element matching the XPath to be displayed and returns it."""
+    return wait_for(driver, "visible", xpath, timeout, EC.visibility_of_element_located((By.XPATH, xpath)))
+
+
+def wait_clickable(driver, xpath, timeout=15):
+    """Waits for an element matching the XPath to be displayed, enabled and not covered, and returns it."""
+    return wait_for(driver, "clickable", xpath, timeout, EC.element_to_be_clickable((By.XPATH, xpath)))
+
+
+def wait_element_clickable(driver, element, timeout=15):
+    """Waits for a known element to be displayed, enabled and not covered, and returns it."""
+    return wait_for(driver, "element_clickable", element, timeout, EC.element_to_be_clickable(element))
+
+
+def wait_backdrop_gone(driver, timeout=5):
+    """Waits until no MUI loading backdrop is covering the page."""
+    return wait_for(driver, "backdrop_gone", timeout=timeout,
+                    fallback=EC.invisibility_of_element_located((By.CLASS_NAME, "MuiBackdrop-root")))
+
+
+def wait_slot_listed(driver, slot_times, timeout=15):
+    """Waits until the court list shows a slot with the given time text (or any of a list of them)."""
+    slot_times = [slot_times] if isinstance(slot_times, str) else list(slot_times)
+    return wait_for(driver, "slot_listed", slot_times, timeout,
+                    EC.any_of(*(EC.presence_of_element_located((By.XPATH, f"//div[contains(@class,'css-uu7ccs')]//span[normalize-space()='{t}']"))
+                                for t in slot_times)))
+
+
+def wait_slot_free(driver, prefs, timeout=15):
+    """Waits until the court list shows a free slot for any of the {"time", "court"} preferences."""
+    return wait_for(driver, "slot_free", list(prefs), timeout,
+                    lambda d: d.execute_script("const arg = arguments[0];" + PREDICATES["slot_free"], list(prefs)))
+
+
+def wait_settled(driver, quiet=0.1, timeout=2):
+    """Waits until the page has had no DOM mutation for `quiet` seconds; returns False if it kept changing."""
+    _ensure_script_timeout(driver, timeout)
+    try:
+        return bool(driver.execute_async_script(SETTLE_SCRIPT, int(quiet * 1000), int(timeout * 1000)))
+    except (JavascriptException, WebDriverException) as e:
+        # Without the observer, give the re-render the fixed pause the bot used to take.
+        print(f"    - Event-driven settle unavailable ({e.__class__.__name__}); pausing instead.")
+        time.sleep(0.5)
+        return False
+
+
+def wait_first_match(driver, candidates, timeout=10):
+    """Waits until any of the [kind, path] candidates is displayed.
+
+    Returns {"index", "element", "matched"}: the first displayed candidate in list order, plus which
+    candidates were displayed at that moment. If the in-page wait cannot run, a polling wait over all
+    candidates returns the element alone.
+    """
+    by = {"css": By.CSS_SELECTOR, "xpath": By.XPATH}
+    fallback = EC.any_of(*(EC.visibility_of_element_located((by[kind], path)) for kind, path in candidates))
+    return wait_for(driver, "first_match", [list(c) for c in candidates], timeout, fallback)
+
+
+def scroll_and_click(driver, element):
+    """Scrolls the element into view and clicks it with JavaScript once layout has settled."""
+    _ensure_script_timeout(driver, 2)
+    driver.execute_async_script(SCROLL_AND_CLICK_JS, element)
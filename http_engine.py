@@ -0,0 +1,181 @@
+# --- Booking Backends ---
+# A booking backend takes (day, time, players) and either confirms a reservation, reports that no
+# slot was available, or raises BackendError when the engine itself failed (so the caller can fall
+# back to another backend). Two implementations exist:
+#   - SeleniumBackend (in "Book a Court.py"): the original headless-Chrome flow.
+#   - HttpBackend (here): talks to the reservation iframe's JSON endpoints directly.
+#
+# The HTTP engine only runs with both BOOKING_API_BASE set and a cached browser session to reuse
+# (see session_cache.py), which needs one successful browser run and a session cache directory that
+# survives between runs. Without either it raises BackendError and the browser flow takes over.
+#
+# The endpoints below are derived from mock_site.py; they have not been checked against the real
+# reservation iframe. The paths are configurable (DEFAULT_PATHS, BOOKING_API_PATHS in the bot):
+#   GET  {api}/availability?date=YYYY-MM-DD -> {"released": bool, "courts": [{"name", "slots": [{"id", "time", "available"}]}]}
+#   GET  {api}/players                      -> {"players": [{"id", "name"}]}
+#   POST {api}/reservations                 <- {"slotId", "players", "duration"}; 201 ok, 409 taken, 401 logged out
+import datetime
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import availability
+
+# Endpoint paths relative to the API base, as served by mock_site.py.
+DEFAULT_PATHS = {"availability": "availability", "players": "players", "reservations": "reservations"}
+
+# The Dutch day names used by the site and config.json, indexed like datetime.weekday().
+DAY_NAMES = ["Maandag", "Dinsdag", "Woensdag", "Donderdag", "Vrijdag", "Zaterdag", "Zondag"]
+
+
+class BackendError(Exception):
+    """Raised when a backend cannot do its job (as opposed to a slot simply being unavailable)."""
+
+
+class AmbiguousBookingError(Exception):
+    """Raised when a reservation request was sent but its outcome is unknown; falling back could double-book."""
+
+
+def next_date_for_day(day_name, today=None):
+    """Returns the date of the next given weekday, 1 to 7 days ahead (the site books a week ahead)."""
+    today = today or datetime.date.today()
+    days_ahead = (DAY_NAMES.index(day_name) - today.weekday()) % 7 or 7
+    return today + datetime.timedelta(days=days_ahead)
+
+
+def batch_result(day, slot_time, status, engine, detail=""):
+    """Builds the per-day result record reported by batch runs."""
+    return {"day": day, "time": slot_time, "status": status, "engine": engine, "detail": detail}
+
+
+class BookingBackend:
+    """Interface shared by the booking engines."""
+
+    name = "base"
+
+    def book(self, day, slot_time, players, release_local=None):
+        """Books `slot_time` on `day` with `players`. Returns True when confirmed, False when no slot was free."""
+        raise NotImplementedError
+
+    def book_batch(self, jobs, players, release_local=None):
+        """Books several (day, time) jobs in turn and returns one result dict per job, in job order.
+
+        Statuses: "booked", "no_slot", "error" (engine failure, may be retried elsewhere) and
+        "uncertain" (a reservation request's outcome is unknown, so it must not be retried).
+        """
+        results = []
+        for day, slot_time in jobs:
+            try:
+                status = "booked" if self.book(day, slot_time, players, release_local) else "no_slot"
+                results.append(batch_result(day, slot_time, status, self.name))
+            except BackendError as e:
+                results.append(batch_result(day, slot_time, "error", self.name, str(e)))
+            except AmbiguousBookingError as e:
+                results.append(batch_result(day, slot_time, "uncertain", self.name, str(e)))
+        return results
+
+    def close(self):
+        """Releases any resources (connections, browsers) held by the backend."""
+
+
+class HttpBackend(BookingBackend):
+    """Books through the reservation iframe's JSON endpoints using one pooled keep-alive session."""
+
+    name = "http"
+
+    def __init__(self, api_base, session_record, attempts=30, interval=0.25, timeout=(3, 5), paths=None):
+        if not api_base:
+            raise BackendError("BOOKING_API_BASE is not configured.")
+        if not session_record:
+            raise BackendError("No cached browser session to authenticate with.")
+        self.api_base = api_base.rstrip("/")
+        self.paths = dict(DEFAULT_PATHS, **(paths or {}))
+        self.attempts = attempts
+        self.interval = interval
+        self.timeout = timeout
+        self.session = requests.Session()
+        # A small pool of keep-alive connections; retries are ours to decide, not urllib3's.
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=4, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Accept": "application/json", "X-Requested-With": "XMLHttpRequest"})
+        for c in session_record["cookies"]:
+            self.session.cookies.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+
+    def _request(self, method, path, **kwargs):
+        try:
+            response = self.session.request(method, f"{self.api_base}/{path}", timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            raise BackendError(f"{method} {path} failed: {e}") from e
+        if response.status_code in (401, 403):
+            raise BackendError(f"{method} {path} was rejected ({response.status_code}); the cached session has expired.")
+        return response
+
+    def _json(self, response):
+        try:
+            return response.json()
+        except ValueError as e:
+            raise BackendError(f"Unexpected non-JSON response from {response.url}") from e
+
+    def availability(self, date):
+        """Returns the raw availability payload for a date."""
+        response = self._request("GET", self.paths["availability"], params={"date": date.isoformat()})
+        if response.status_code != 200:
+            raise BackendError(f"Availability request returned {response.status_code}.")
+        return self._json(response)
+
+    def player_ids(self, players):
+        """Maps player names to the ids the reservation endpoint expects."""
+        response = self._request("GET", self.paths["players"])
+        known = {p["name"]: p["id"] for p in self._json(response).get("players", [])}
+        missing = [name for name in players if name not in known]
+        if missing:
+            raise BackendError(f"Unknown players: {', '.join(missing)}")
+        return [known[name] for name in players]
+
+    def reserve(self, slot_id, player_ids):
+        """Tries to reserve one slot. Returns True on success, False if someone else got it first."""
+        try:
+            response = self.session.post(f"{self.api_base}/{self.paths['reservations']}", timeout=self.timeout,
+                                         json={"slotId": slot_id, "players": player_ids, "duration": 60})
+        except requests.ConnectTimeout as e:
+            # The connection was never made, so nothing was booked and another engine may safely retry.
+            raise BackendError(f"POST reservations failed: {e}") from e
+        except requests.RequestException as e:
+            # The request may have reached the server, so the slot might be ours already.
+            raise AmbiguousBookingError(f"Reservation request for {slot_id} failed mid-flight: {e}") from e
+        if response.status_code in (401, 403):
+            raise BackendError(f"Reservation was rejected ({response.status_code}); the cached session has expired.")
+        if response.status_code in (200, 201):
+            return True
+        if response.status_code == 409:
+            return False
+        # Any other answer (a 5xx or gateway timeout above all) means the request reached the server,
+        # so the slot may be booked already; another engine must not try again.
+        raise AmbiguousBookingError(f"Reservation request for {slot_id} returned {response.status_code}; outcome unknown.")
+
+    def book(self, day, slot_time, players, release_local=None):
+        print(f"--- HTTP engine: booking {day} at {availability.describe(slot_time)} ---")
+        prefs = availability.parse_preferences(slot_time)
+        date = next_date_for_day(day)
+        # Resolve the players (and warm up the pooled connection) before the release moment.
+        player_ids = self.player_ids(players)
+        if release_local is not None:
+            while (remaining := release_local - time.time()) > 0:
+                time.sleep(remaining - 0.02 if remaining > 0.02 else 0)
+        for attempt in range(self.attempts):
+            data = self.availability(date)
+            slots = availability.slots_from_payload(data)
+            # Same ranking as the browser flow: the best preference that has a free slot goes first.
+            free = [slots[index] for index, _ in availability.rank_free(slots, prefs)]
+            print(f"  - Attempt {attempt + 1}/{self.attempts}: {len(free)} acceptable free slot(s) on {date}.")
+            for slot in free:
+                if self.reserve(slot["id"], player_ids):
+                    print(f"🎉 Reservation confirmed via HTTP ({slot['id']}).")
+                    return True
+            time.sleep(self.interval)
+        return False
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,510 @@
+# --- Local stand-in for the club website ---
+# This module serves a small copy of the parts of ltvbest.nl that the bot touches:
+# the landing page, the login form, the MIJNLTVBEST menu and a reservation iframe
+# that mimics the MUI court overview. Slots "unlock" at a configurable release moment,
+# so armed mode and selector changes can be exercised without the live site.
+#
+# Failures can be switched on to exercise the bot's recovery paths: extra loading backdrops
+# (--backdrop-chance), a forced logout after a number of API calls (--logout-after) and a
+# transparent overlay that swallows clicks on the court list for a while (--intercept-ms) and an error
+# status for reservations that did go through, like a gateway timing out on a slow backend (--reservation-error).
+#
+# Usage:
+#   python mock_site.py --port 8765 --release-in 60
+#   python mock_site.py --latency-ms 120 --page-latency-ms 80 --backdrop-chance 0.5 --logout-after 3
+#   BASE_URL=http://127.0.0.1:8765/ RELEASE_AT=<printed timestamp> python -u "Book a Court.py"
+import argparse
+import datetime
+import email.utils
+import json
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# The Dutch day names, indexed like datetime.weekday() (0 = Monday).
+DAY_NAMES = ["Maandag", "Dinsdag", "Woensdag", "Donderdag", "Vrijdag", "Zaterdag", "Zondag"]
+# The time slots that every court offers by default.
+DEFAULT_TIMES = ["19:30 - 20:30", "20:30 - 21:30", "21:30 - 22:30"]
+# The members that can be added as players by default (matches the bot's player list).
+DEFAULT_PLAYERS = ["Luc Brenkman", "Valentijn Wiegmans", "Quinten Wiegmans", "Jan Jansen"]
+
+# --- Page Templates ---
+PAGE_STYLE = """
+<style>
+  body { font-family: sans-serif; margin: 0; padding: 1rem; }
+  .menu { display: inline-block; position: relative; }
+  .submenu { display: none; position: absolute; background: #fff; border: 1px solid #ccc; padding: .5rem; }
+  .menu:hover .submenu { display: block; }
+  .MuiBackdrop-root { position: fixed; inset: 0; background: rgba(0,0,0,.4); z-index: 100; }
+  .css-uu7ccs { display: flex; gap: .5rem; padding: .25rem; }
+  .Mui-disabled { opacity: .4; }
+  .toast { position: fixed; bottom: 1rem; right: 1rem; background: #2e7d32; color: #fff; padding: 1rem; }
+  #courts { position: relative; }
+  .click-shield { position: absolute; inset: 0; z-index: 50; }
+</style>
+"""
+
+LANDING_LOGGED_OUT = """<!DOCTYPE html><html><head><title>LTV Best (mock)</title>""" + PAGE_STYLE + """</head><body>
+<div id="cookie-banner"><button type="button" onclick="this.parentNode.remove()">Accepteer cookies</button></div>
+<header><a href="/login"><span>Inloggen</span></a></header>
+<main><h1>Welkom bij LTV Best</h1></main>
+</body></html>"""
+
+LANDING_LOGGED_IN = """<!DOCTYPE html><html><head><title>LTV Best (mock)</title>""" + PAGE_STYLE + """</head><body>
+<header>
+  <nav><div class="menu"><a href="#">MIJNLTVBEST</a>
+    <div class="submenu"><a href="/reserveren">Baan reserveren</a></div>
+  </div></nav>
+</header>
+<main><h1>Welkom terug</h1></main>
+</body></html>"""
+
+LOGIN_PAGE = """<!DOCTYPE html><html><head><title>Inloggen (mock)</title>""" + PAGE_STYLE + """</head><body>
+<form method="post" action="/login">
+  <input id="login-username" name="username" type="text">
+  <input id="login-password" name="password" type="password">
+  <input type="submit" value="Inloggen">
+</form>
+</body></html>"""
+
+RESERVATION_PAGE = """<!DOCTYPE html><html><head><title>Baan reserveren (mock)</title>""" + PAGE_STYLE + """</head><body>
+<header><span>MIJNLTVBEST</span></header>
+<iframe src="/app" style="width:100%;height:900px;border:0"></iframe>
+</body></html>"""
+
+# The reservation app. Every top-level block is a direct child of <body> so the bot's
+# broad "//div[contains(., ...)]" selectors resolve to the intended element.
+APP_PAGE = """<!DOCTYPE html><html><head><title>Reserveren (mock)</title>""" + PAGE_STYLE + """</head><body>
+<button type="button" id="overview">Overzicht banen</button>
+<div id="toolbar" hidden>
+  <button type="button" id="day-picker">Vandaag</button>
+  <button type="button" value="list" aria-pressed="false" id="list-toggle">Lijst</button>
+</div>
+<div id="day-list" hidden></div>
+<div id="courts"></div>
+<div id="duration" class="duration-option" hidden><span>60 min.</span> <span>4 spelers</span></div>
+<div id="player-slot" hidden><span>Speler 2</span></div>
+<div id="player-list" hidden></div>
+<button type="button" id="confirm" class="MuiButton-containedPrimary" hidden>Reservering bevestigen</button>
+<div id="backdrop" class="MuiBackdrop-root" style="display:none"></div>
+<script>
+const DAY_NAMES = __DAY_NAMES__;
+// {backdropMs, backdropChance, interceptMs}; see MockClub.
+const CONFIG = __CONFIG__;
+const state = { date: null, slotId: null, players: [] };
+const $ = (id) => document.getElementById(id);
+
+function isoDate(d) { return d.toISOString().slice(0, 10); }
+
+function showBackdrop(ms) {
+  // Mimic the MUI loading overlay that blocks clicks while data is fetched.
+  $('backdrop').style.display = 'block';
+  return new Promise((resolve) => setTimeout(() => { $('backdrop').style.display = 'none'; resolve(); }, ms));
+}
+
+function maybeStrayBackdrop() {
+  // A late re-render that briefly covers the page again, like the real app does on slow fetches.
+  if (Math.random() < CONFIG.backdropChance) showBackdrop(CONFIG.backdropMs);
+}
+
+function shieldCourts() {
+  // An invisible layer over the freshly rendered list that swallows clicks until it goes away.
+  if (!CONFIG.interceptMs) return;
+  const shield = document.createElement('div');
+  shield.className = 'click-shield';
+  shield.addEventListener('click', (e) => e.stopPropagation());
+  $('courts').appendChild(shield);
+  setTimeout(() => shield.remove(), CONFIG.interceptMs);
+}
+
+async function api(path, options) {
+  const response = await fetch(path, Object.assign({ credentials: 'same-origin' }, options || {}));
+  if (response.status === 401) { window.top.location.href = '/'; throw new Error('logged out'); }
+  return response.json();
+}
+
+$('overview').addEventListener('click', async () => {
+  await showBackdrop(CONFIG.backdropMs);
+  $('toolbar').hidden = false;
+});
+
+$('day-picker').addEventListener('click', () => {
+  // List the next seven days by name; "Vandaag" itself is the picker button.
+  const list = $('day-list');
+  list.innerHTML = '';
+  for (let offset = 1; offset <= 7; offset++) {
+    const d = new Date(Date.now() + offset * 86400000);
+    const span = document.createElement('span');
+    span.textContent = DAY_NAMES[(d.getDay() + 6) % 7];
+    span.style.marginRight = '1rem';
+    span.addEventListener('click', () => selectDay(isoDate(d), span.textContent));
+    list.appendChild(span);
+  }
+  list.hidden = false;
+});
+
+$('list-toggle').addEventListener('click', (e) => {
+  const pressed = e.currentTarget.getAttribute('aria-pressed') === 'true';
+  e.currentTarget.setAttribute('aria-pressed', pressed ? 'false' : 'true');
+});
+
+async function selectDay(date, label) {
+  $('day-list').hidden = true;
+  $('day-picker').textContent = label;
+  state.date = date;
+  const loading = showBackdrop(CONFIG.backdropMs);
+  const data = await api('/api/availability?date=' + date);
+  await loading;
+  renderCourts(data);
+  shieldCourts();
+  maybeStrayBackdrop();
+}
+
+function renderCourts(data) {
+  const container = $('courts');
+  container.innerHTML = '';
+  data.courts.forEach((court, index) => {
+    const accordion = document.createElement('div');
+    accordion.className = 'MuiAccordion-root';
+    const summary = document.createElement('button');
+    summary.type = 'button';
+    summary.className = 'MuiAccordionSummary-root';
+    summary.id = 'Accordion-' + court.id;
+    summary.setAttribute('aria-expanded', index === 0 ? 'true' : 'false');
+    summary.textContent = court.name;
+    const details = document.createElement('div');
+    details.className = 'MuiAccordionDetails-root';
+    details.hidden = index !== 0;
+    summary.addEventListener('click', () => {
+      const expanded = summary.getAttribute('aria-expanded') === 'true';
+      summary.setAttribute('aria-expanded', expanded ? 'false' : 'true');
+      details.hidden = expanded;
+    });
+    if (!data.released) {
+      details.appendChild(document.createTextNode('Nog niet vrijgegeven'));
+    }
+    court.slots.filter(() => data.released).forEach((slot) => {
+      const row = document.createElement('div');
+      row.className = 'MuiBox-root css-uu7ccs' + (slot.available ? '' : ' Mui-disabled');
+      const radio = document.createElement('input');
+      radio.type = 'radio';
+      radio.name = 'slot';
+      radio.value = slot.id;
+      radio.disabled = !slot.available;
+      radio.addEventListener('change', () => openBooking(slot.id));
+      const label = document.createElement('span');
+      label.textContent = slot.time;
+      row.appendChild(radio);
+      row.appendChild(label);
+      details.appendChild(row);
+    });
+    accordion.appendChild(summary);
+    accordion.appendChild(details);
+    container.appendChild(accordion);
+  });
+}
+
+async function openBooking(slotId) {
+  state.slotId = slotId;
+  state.players = [];
+  $('duration').hidden = false;
+  $('player-slot').hidden = false;
+  maybeStrayBackdrop();
+}
+
+$('duration').addEventListener('click', () => { $('duration').dataset.selected = 'true'; });
+
+$('player-slot').addEventListener('click', async () => {
+  const data = await api('/api/players');
+  const list = $('player-list');
+  list.innerHTML = '';
+  data.players.forEach((player) => {
+    const row = document.createElement('div');
+    row.className = 'player-row';
+    const name = document.createElement('div');
+    name.className = 'css-1c1kq07';
+    name.innerHTML = '<span></span>';
+    name.firstChild.textContent = player.name;
+    const add = document.createElement('button');
+    add.type = 'button';
+    add.textContent = '+';
+    add.addEventListener('click', () => { state.players.push(player.id); add.disabled = true; });
+    row.appendChild(name);
+    row.appendChild(add);
+    list.appendChild(row);
+  });
+  list.hidden = false;
+  $('confirm').hidden = false;
+  maybeStrayBackdrop();
+});
+
+$('confirm').addEventListener('click', async () => {
+  const result = await api('/api/reservations', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ slotId: state.slotId, players: state.players, duration: 60 }),
+  });
+  const toast = document.createElement('div');
+  toast.className = 'toast';
+  toast.textContent = result.status === 'ok' ? 'Reservering succesvol aangemaakt' : 'Reservering mislukt';
+  document.body.appendChild(toast);
+});
+</script>
+</body></html>"""
+
+
+# --- Mock Club State ---
+class MockClub:
+    """Holds the sessions, courts and bookings of the stand-in site."""
+
+    def __init__(self, release_at=None, courts=4, times=None, players=None, clock_skew=0.0,
+                 latency_ms=0, backdrop_ms=150, page_latency_ms=0, backdrop_chance=0.0, logout_after=None,
+                 intercept_ms=0, reservation_error=None):
+        # The release moment in *server* time (Unix seconds); None means slots are always open.
+        self.release_at = release_at
+        # The court names, formatted like the real site ("P 1", "P 2", ...).
+        self.courts = [f"P {n}" for n in range(1, courts + 1)]
+        self.times = times or list(DEFAULT_TIMES)
+        self.players = [{"id": f"member-{i}", "name": name} for i, name in enumerate(players or DEFAULT_PLAYERS, 1)]
+        # How far the server clock runs ahead of the local clock, used to exercise clock sync.
+        self.clock_skew = clock_skew
+        # Artificial latency added to every API call, and how long the loading backdrop stays up.
+        self.latency_ms = latency_ms
+        self.backdrop_ms = backdrop_ms
+        # Artificial latency for the HTML pages (landing, login, reservation page and iframe).
+        self.page_latency_ms = page_latency_ms
+        # --- Failure injection ---
+        # Chance (0..1) that the app shows an extra backdrop after rendering the list, picking a slot or opening the players.
+        self.backdrop_chance = backdrop_chance
+        # Drop the first session after this many API calls, so the app bounces to the logged-out homepage once.
+        self.logout_after = logout_after
+        # How long an invisible overlay swallows clicks on a freshly rendered court list.
+        self.intercept_ms = intercept_ms
+        # Answer successful reservation POSTs with this status (e.g. 504) instead of 201; the booking is still made.
+        self.reservation_error = reservation_error
+        self.api_calls = {}
+        self.forced_logouts = 0
+        self.sessions = set()
+        self.bookings = {}
+        self.lock = threading.Lock()
+
+    def now(self):
+        """Returns the current server time in Unix seconds."""
+        return time.time() + self.clock_skew
+
+    def is_released(self):
+        return self.release_at is None or self.now() >= self.release_at
+
+    def count_api_call(self, session):
+        """Counts an API call for a session; returns False once the session has been forcibly logged out."""
+        with self.lock:
+            if session not in self.sessions:
+                return False
+            self.api_calls[session] = self.api_calls.get(session, 0) + 1
+            if self.logout_after is not None and not self.forced_logouts and self.api_calls[session] > self.logout_after:
+                self.sessions.discard(session)
+                self.forced_logouts += 1
+                return False
+            return True
+
+    def app_config(self):
+        """The failure settings the reservation app reads in the browser."""
+        return {"backdropMs": self.backdrop_ms, "backdropChance": self.backdrop_chance, "interceptMs": self.intercept_ms}
+
+    def availability(self, date):
+        """Builds the availability payload served to the reservation iframe."""
+        released = self.is_released()
+        courts = []
+        for court in self.courts:
+            slots = []
+            for slot_time in self.times:
+                slot_id = f"{date}|{court}|{slot_time}"
+                slots.append({"id": slot_id, "time": slot_time, "available": released and slot_id not in self.bookings})
+            courts.append({"id": court.replace(" ", "-"), "name": court, "slots": slots})
+        return {"date": date, "released": released, "courts": courts}
+
+    def reserve(self, slot_id, players):
+        """Books a slot once; returns False when it was already taken or not yet released."""
+        with self.lock:
+            if not self.is_released() or slot_id in self.bookings:
+                return False
+            self.bookings[slot_id] = {"slotId": slot_id, "players": players, "at": self.now()}
+            return True
+
+
+# --- Request Handler ---
+class MockClubHandler(BaseHTTPRequestHandler):
+    """Serves the pages and JSON endpoints of the stand-in site."""
+
+    # Keep-alive connections, like the real site.
+    protocol_version = "HTTP/1.1"
+    club = None
+
+    def log_message(self, format, *args):
+        # Stay quiet; the bot's own output is what matters during a test run.
+        pass
+
+    def date_time_string(self, timestamp=None):
+        # Stamp the 'Date' header with the (optionally skewed) server clock.
+        return email.utils.formatdate(self.club.now() if timestamp is None else timestamp, usegmt=True)
+
+    def _session(self):
+        cookie = self.headers.get("Cookie", "")
+        for part in cookie.split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "mock_session" and value in self.club.sessions:
+                return value
+        return None
+
+    def _send(self, status, body, content_type="text/html; charset=utf-8", headers=None):
+        payload = body.encode("utf-8") if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(payload)
+
+    def _send_json(self, status, data):
+        self._send(status, json.dumps(data), "application/json")
+
+    def _redirect(self, location, headers=None):
+        self._send(303, "", headers=dict(headers or {}, Location=location))
+
+    def _api_delay(self):
+        if self.club.latency_ms:
+            time.sleep(self.club.latency_ms / 1000)
+
+    def _page_delay(self):
+        if self.club.page_latency_ms:
+            time.sleep(self.club.page_latency_ms / 1000)
+
+    def _api_session(self):
+        """Returns the caller's session for an API call, or None if it is missing or was just logged out."""
+        session = self._session()
+        return session if session and self.club.count_api_call(session) else None
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/api/"):
+            self._api_delay()
+            session = self._api_session()
+        else:
+            if not url.path.startswith("/__"):
+                self._page_delay()
+            session = self._session()
+        if url.path == "/":
+            self._send(200, LANDING_LOGGED_IN if session else LANDING_LOGGED_OUT)
+        elif url.path == "/login":
+            self._send(200, LOGIN_PAGE)
+        elif url.path == "/reserveren":
+            if not session:
+                self._redirect("/")
+            else:
+                self._send(200, RESERVATION_PAGE)
+        elif url.path == "/app":
+            page = APP_PAGE.replace("__DAY_NAMES__", json.dumps(DAY_NAMES)).replace("__CONFIG__", json.dumps(self.club.app_config()))
+            self._send(200, page)
+        elif url.path.startswith("/api/"):
+            if not session:
+                self._send_json(401, {"error": "unauthenticated"})
+            elif url.path == "/api/availability":
+                date = parse_qs(url.query).get("date", [datetime.date.today().isoformat()])[0]
+                self._send_json(200, self.club.availability(date))
+            elif url.path == "/api/players":
+                self._send_json(200, {"players": self.club.players})
+            else:
+                self._send_json(404, {"error": "not found"})
+        elif url.path == "/__bookings":
+            self._send_json(200, {"bookings": list(self.club.bookings.values())})
+        else:
+            self._send(404, "not found", "text/plain")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length).decode("utf-8") if length else ""
+        if url.path == "/login":
+            self._page_delay()
+            form = parse_qs(raw)
+            if form.get("username", [""])[0] and form.get("password", [""])[0]:
+                token = secrets.token_hex(16)
+                self.club.sessions.add(token)
+                self._redirect("/", {"Set-Cookie": f"mock_session={token}; Path=/; HttpOnly"})
+            else:
+                self._send(200, LOGIN_PAGE)
+        elif url.path == "/api/reservations":
+            self._api_delay()
+            if not self._api_session():
+                self._send_json(401, {"error": "unauthenticated"})
+                return
+            body = json.loads(raw or "{}")
+            if self.club.reserve(body.get("slotId"), body.get("players", [])):
+                if self.club.reservation_error:
+                    self._send_json(self.club.reservation_error, {"error": "upstream timed out"})
+                    return
+                self._send_json(201, {"status": "ok", "reservationId": body.get("slotId")})
+            else:
+                self._send_json(409, {"status": "taken"})
+        else:
+            self._send(404, "not found", "text/plain")
+
+
+def start_server(club, host="127.0.0.1", port=0):
+    """Starts the stand-in site in a background thread and returns (server, base_url)."""
+    handler = type("BoundMockClubHandler", (MockClubHandler,), {"club": club})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for the club website.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--release-at", type=float, help="Unix timestamp (server clock) at which slots unlock.")
+    parser.add_argument("--release-in", type=float, help="Seconds from now at which slots unlock.")
+    parser.add_argument("--courts", type=int, default=4)
+    parser.add_argument("--times", nargs="+", default=DEFAULT_TIMES)
+    parser.add_argument("--clock-skew", type=float, default=0.0, help="Seconds the server clock runs ahead of this machine.")
+    parser.add_argument("--latency-ms", type=int, default=0, help="Artificial latency for every API call.")
+    parser.add_argument("--backdrop-ms", type=int, default=150, help="How long the loading backdrop blocks clicks.")
+    parser.add_argument("--page-latency-ms", type=int, default=0, help="Artificial latency for every HTML page.")
+    parser.add_argument("--backdrop-chance", type=float, default=0.0, help="Chance (0..1) of an extra backdrop after list, slot and player updates.")
+    parser.add_argument("--logout-after", type=int, help="Log the first session out after this many API calls.")
+    parser.add_argument("--intercept-ms", type=int, default=0, help="How long an invisible overlay swallows clicks on a new court list.")
+    parser.add_argument("--reservation-error", type=int, help="Status to answer successful reservations with (e.g. 504).")
+    return parser
+
+
+def club_from_args(args):
+    """Creates a MockClub from parsed command-line arguments."""
+    release_at = args.release_at
+    if release_at is None and args.release_in is not None:
+        release_at = time.time() + args.clock_skew + args.release_in
+    return MockClub(release_at=release_at, courts=args.courts, times=args.times, clock_skew=args.clock_skew,
+                    latency_ms=args.latency_ms, backdrop_ms=args.backdrop_ms, page_latency_ms=args.page_latency_ms,
+                    backdrop_chance=args.backdrop_chance, logout_after=args.logout_after, intercept_ms=args.intercept_ms,
+                    reservation_error=args.reservation_error)
+
+
+if __name__ == "__main__":
+    args = build_arg_parser().parse_args()
+    club = club_from_args(args)
+    server, base_url = start_server(club, args.host, args.port)
+    print(f"🎾 Mock club site running at {base_url}")
+    if club.release_at is not None:
+        print(f"   Slots unlock at {club.release_at:.3f} (server clock), i.e. RELEASE_AT={club.release_at:.3f}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
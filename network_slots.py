@@ -0,0 +1,105 @@
+# --- Network-Driven Slot Detection ---
+# The DOM path only sees a slot once the reservation app has fetched the availability, rendered the
+# court list, and a scan has matched it. With Chrome's performance log switched on
+# (goog:loggingPrefs {"performance": "ALL"}), chromedriver records the page's DevTools network events.
+# The bot can then read the availability response itself (Network.getResponseBody) as soon as it
+# has arrived, inside the same uc.Chrome session:
+#   - if nothing acceptable is free, or the day is not released yet, the attempt ends right there;
+#   - otherwise the click is aimed straight at the free slot, without waiting for the list to render.
+#
+# This only works while the availability request is made by a frame that chromedriver follows. A
+# reservation iframe served from another site can run out of process, and then its requests never
+# show up. The watcher gives up after its first wait that sees no response at all (or when the
+# response does not have the expected shape), and from then on the DOM path works exactly as before.
+import base64
+import json
+import time
+
+from selenium.common.exceptions import WebDriverException
+
+# Chrome options for the performance log: network events only (page events would just add volume).
+LOGGING_PREFS = {"performance": "ALL"}
+PERF_LOGGING_PREFS = {"enableNetwork": True, "enablePage": False}
+
+
+class AvailabilityWatcher:
+    """Reads the newest availability response from a driver's performance log."""
+
+    def __init__(self, driver, url_pattern="/availability"):
+        self.driver = driver
+        self.url_pattern = url_pattern
+        # Availability responses whose body has not finished loading yet: requestId -> url.
+        self._pending = {}
+        self.seen_response = False
+        self.gave_up = False
+
+    def _poll(self):
+        """Reads the log entries since the last call; returns the ids of completed availability requests."""
+        finished = []
+        for entry in self.driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            method, params = message.get("method"), message.get("params", {})
+            if method == "Network.responseReceived" and self.url_pattern in params.get("response", {}).get("url", ""):
+                self._pending[params["requestId"]] = params["response"]["url"]
+                # The requests are visible, so a later slow response is no reason to give up.
+                self.seen_response = True
+            elif method == "Network.loadingFinished" and params.get("requestId") in self._pending:
+                finished.append(params["requestId"])
+            elif method == "Network.loadingFailed":
+                self._pending.pop(params.get("requestId"), None)
+        return finished
+
+    def discard(self):
+        """Forgets every response so far; call it right before triggering a fresh availability request."""
+        if self.gave_up:
+            return
+        try:
+            self._poll()
+        except WebDriverException as e:
+            self.give_up(f"cannot read the performance log ({e.msg})")
+        self._pending.clear()
+
+    def latest(self, timeout=5, poll=0.02):
+        """Returns the newest availability payload since the last call, waiting up to `timeout` seconds.
+
+        Returns None if none arrived in time or it could not be read; the caller then uses the DOM.
+        """
+        if self.gave_up:
+            return None
+        deadline = time.time() + timeout
+        try:
+            while True:
+                finished = self._poll()
+                if finished:
+                    for request_id in finished:
+                        self._pending.pop(request_id, None)
+                    body = self.driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": finished[-1]})
+                    text = base64.b64decode(body["body"]).decode("utf-8") if body.get("base64Encoded") else body["body"]
+                    return json.loads(text)
+                if time.time() >= deadline:
+                    if not self.seen_response:
+                        self.give_up(f"no '{self.url_pattern}' response within {timeout}s")
+                    return None
+                time.sleep(poll)
+        except WebDriverException as e:
+            # E.g. the body was already evicted from the browser's buffer; the DOM still has the answer.
+            print(f"⚠️ Could not read the availability response: {e.msg}")
+        except (KeyError, ValueError) as e:
+            print(f"⚠️ Could not parse the availability response: {e}")
+        return None
+
+    def give_up(self, reason):
+        """Stops network detection for this browser; every later attempt uses the court list."""
+        self.gave_up = True
+        print(f"⚠️ Network slot detection unavailable ({reason}); using the court list instead.")
+
+
+def watcher_for(driver, url_pattern):
+    """Returns the driver's AvailabilityWatcher (one per browser), or None once it has given up."""
+    watcher = getattr(driver, "_availability_watcher", None)
+    if watcher is None:
+        watcher = driver._availability_watcher = AvailabilityWatcher(driver, url_pattern)
+    return None if watcher.gave_up else watcher
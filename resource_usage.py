@@ -0,0 +1,121 @@
+# --- Process-Tree Resource Accounting ---
+# Samples the memory and CPU use of a process and all of its descendants (for the bot: the Python
+# worker, chromedriver and every Chrome process it started) from /proc, so a run can report what one
+# browser session costs and how many of them a machine can hold. On systems without /proc the
+# sampler simply reports nothing.
+import os
+import threading
+import time
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def proc_available():
+    return os.path.isdir("/proc/self")
+
+
+def _read_stat(pid):
+    """Returns (parent pid, user + system cpu seconds) for a pid, or None if it is gone."""
+    try:
+        with open(f"/proc/{pid}/stat", encoding="ascii", errors="replace") as f:
+            data = f.read()
+    except OSError:
+        return None
+    # The command name may contain spaces and parentheses; the fields after its closing ')' are fixed.
+    fields = data[data.rfind(")") + 2:].split()
+    # Reaped children's time (cutime/cstime) is left out: those children were sampled themselves.
+    utime, stime = int(fields[11]), int(fields[12])
+    return int(fields[1]), (utime + stime) / _CLOCK_TICKS
+
+
+def _read_rss(pid):
+    """Returns the resident set size of a pid in bytes (0 if it is gone)."""
+    try:
+        with open(f"/proc/{pid}/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+
+def process_tree(root_pid):
+    """Returns {pid: cpu_seconds} for root_pid and all of its descendants."""
+    stats = {}
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            stat = _read_stat(int(entry))
+            if stat:
+                stats[int(entry)] = stat
+    tree, frontier = {}, [root_pid]
+    while frontier:
+        pid = frontier.pop()
+        if pid in stats and pid not in tree:
+            tree[pid] = stats[pid][1]
+            frontier += [child for child, (parent, _) in stats.items() if parent == pid]
+    return tree
+
+
+def available_memory():
+    """Returns MemAvailable from /proc/meminfo in bytes, or None."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class TreeSampler:
+    """Samples the RSS and CPU time of a process tree in a background thread."""
+
+    def __init__(self, root_pid=None, interval=1.0):
+        self.root_pid = root_pid or os.getpid()
+        self.interval = interval
+        self.samples = 0
+        self.rss_total = 0
+        self.peak_rss = 0
+        self.peak_processes = 0
+        # The last CPU time seen per pid, so processes that exit still count.
+        self._cpu = {}
+        # CPU time already used before sampling started (e.g. by the interpreter's own start-up).
+        self._cpu_base = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self._started = None
+
+    def sample(self):
+        tree = process_tree(self.root_pid)
+        rss = sum(_read_rss(pid) for pid in tree)
+        self.samples += 1
+        self.rss_total += rss
+        self.peak_rss = max(self.peak_rss, rss)
+        self.peak_processes = max(self.peak_processes, len(tree))
+        self._cpu.update(tree)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        self._started = time.time()
+        if proc_available():
+            self.sample()
+            self._cpu_base = sum(self._cpu.values())
+            self._thread = threading.Thread(target=self._run, name="usage-sampler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops sampling and returns the summary (an empty dict when /proc is not available)."""
+        self._stop.set()
+        if self._thread is None:
+            return {}
+        self._thread.join()
+        self.sample()
+        wall = time.time() - self._started
+        cpu = sum(self._cpu.values()) - self._cpu_base
+        return {"peak_rss_mb": round(self.peak_rss / 2 ** 20, 1), "avg_rss_mb": round(self.rss_total / self.samples / 2 ** 20, 1),
+                "cpu_seconds": round(cpu, 1), "cpu_percent": round(100 * cpu / wall, 1) if wall else 0.0,
+                "peak_processes": self.peak_processes, "wall_seconds": round(wall, 1)}
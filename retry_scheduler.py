@@ -0,0 +1,101 @@
+# --- Tiered Retry Scheduling ---
+# Decides how the slot search recovers between attempts and how long it pauses. Recovery actions are
+# ordered from cheap to expensive ("tiers", e.g. re-select the day < refresh the page < log in again).
+# The scheduler stays on the cheapest tier and only escalates when that tier keeps failing to bring a
+# fresh list (a slot that is simply taken or not released yet is not the tier's fault); once an
+# expensive tier has produced a fresh page it drops back to the cheapest one.
+#
+# Pauses are tight inside the release window (when slots are being freed and every moment counts)
+# and back off exponentially, with jitter, outside it. The search ends after a maximum number of
+# attempts or a time budget, whichever comes first.
+import random
+import time
+
+
+class RetryScheduler:
+    """Tracks attempts, the current recovery tier and the pause before the next attempt."""
+
+    def __init__(self, tiers, max_attempts=30, budget_seconds=None, escalate_after=3, window=None,
+                 tight_interval=0.25, backoff_base=1.0, backoff_max=8.0, jitter=0.3,
+                 clock=time.time, sleep=time.sleep, rng=random.random):
+        self.tiers = list(tiers)
+        self.max_attempts = max_attempts
+        self.budget_seconds = budget_seconds
+        # Consecutive failures on one tier before moving up to the next.
+        self.escalate_after = max(1, escalate_after)
+        # (start, end) in clock seconds during which to retry at the tight interval; None means never.
+        self.window = window
+        self.tight_interval = tight_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.jitter = jitter
+        self._clock, self._sleep, self._rng = clock, sleep, rng
+        self.started = clock()
+        self.attempt = 0
+        self.level = 0
+        self.streak = 0
+        self._backoff_step = 0
+
+    @property
+    def tier(self):
+        """The recovery tier to use after the next failed attempt."""
+        return self.tiers[self.level]
+
+    def exhausted(self):
+        """True once the attempt limit or the time budget is used up."""
+        if self.attempt >= self.max_attempts:
+            return True
+        return self.budget_seconds is not None and self._clock() - self.started >= self.budget_seconds
+
+    def next_attempt(self):
+        """Starts the next attempt and returns its 1-based number."""
+        self.attempt += 1
+        return self.attempt
+
+    def failed(self):
+        """Records a failed attempt on the current tier, escalating after `escalate_after` in a row."""
+        self.streak += 1
+        if self.streak >= self.escalate_after:
+            self.escalate()
+
+    def refreshed(self):
+        """Records an attempt that saw a fresh list with nothing to book: the tier works, so its streak resets."""
+        self.streak = 0
+
+    def escalate(self, tier=None):
+        """Moves up one tier (or straight to `tier`, e.g. a re-login after a detected logout)."""
+        self.level = self.tiers.index(tier) if tier is not None else min(self.level + 1, len(self.tiers) - 1)
+        self.streak = 0
+
+    def step_down(self):
+        """Moves down one tier after the top tier failed outright, instead of repeating it on every attempt."""
+        self.level = max(self.level - 1, 0)
+        self.streak = 0
+
+    def recovered(self, tier):
+        """Records that a recovery tier brought the page back; an expensive one resets to the cheapest."""
+        if tier != self.tiers[0]:
+            self.level = 0
+            self.streak = 0
+
+    def in_window(self, now=None):
+        now = self._clock() if now is None else now
+        return self.window is not None and self.window[0] <= now <= self.window[1]
+
+    def interval(self):
+        """Returns the pause before the next attempt: tight in the window, jittered backoff outside it."""
+        if self.in_window():
+            self._backoff_step = 0
+            return self.tight_interval
+        delay = self.backoff_base * 2 ** self._backoff_step * (1 + self.jitter * (2 * self._rng() - 1))
+        self._backoff_step += 1
+        return min(self.backoff_max, delay)
+
+    def pause(self):
+        """Sleeps for the next interval, never past the time budget, and returns how long it slept."""
+        delay = self.interval()
+        if self.budget_seconds is not None:
+            delay = min(delay, max(0.0, self.started + self.budget_seconds - self._clock()))
+        if delay > 0:
+            self._sleep(delay)
+        return delay
@@ -14,7 +14,7 @@ document.addEventListener('DOMContentLoaded', function () {
                 <input type="checkbox" id="check-${day}" data-day="${day}">
                 ${day}
             </label>
-            <input type="text" id="time-${day}" placeholder="e.g., 20:30 - 21:30" disabled>
+            <input type="text" id="time-${day}" placeholder="e.g., 20:30 - 21:30 @ P 3, 20:30 - 21:30, 19:30 - 20:30" disabled>
         `;
         form.appendChild(dayDiv);
     });
@@ -31,6 +31,16 @@ document.addEventListener('DOMContentLoaded', function () {
         }
     });
 
+    // Turn "20:30 - 21:30 @ P 3, 19:30 - 20:30" into ranked preferences: a plain time string when there
+    // is only one option without a court, otherwise a list of times and {time, court} objects.
+    function parsePreferences(text) {
+        const prefs = text.split(',').map(part => part.trim()).filter(part => part !== '').map(part => {
+            const [time, court] = part.split('@').map(piece => piece.trim());
+            return court ? { time: time, court: court } : time;
+        });
+        return prefs.length === 1 && typeof prefs[0] === 'string' ? prefs[0] : prefs;
+    }
+
     // Generate JSON on button click
     saveBtn.addEventListener('click', () => {
         const config = {};
@@ -39,7 +49,7 @@ document.addEventListener('DOMContentLoaded', function () {
             if (checkbox.checked) {
                 const timeInput = document.getElementById(`time-${day}`);
                 if (timeInput.value.trim() !== "") {
-                    config[day] = timeInput.value.trim();
+                    config[day] = parsePreferences(timeInput.value);
                 }
             }
         });
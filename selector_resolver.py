@@ -0,0 +1,174 @@
+# --- Adaptive Selector Resolution ---
+# Finding an element through a list of fallback selectors used to cost one full wait per miss: if the
+# first selector stopped matching, the next one was only tried after a 10-15 s timeout. The resolver
+# checks every candidate in one in-page pass (dom_waits.wait_first_match) and remembers, per named
+# target ("login_button", "confirm_button", ...), which selector actually matched. The candidates keep
+# their declared order, most specific first, so a broad fallback never wins while a specific selector
+# is also on screen. The learned winner is only used for reporting: a winner that stops matching is
+# reported and recorded as stale, so site changes show up in the log (and in the cache file) without
+# costing a booking.
+#
+# Lookups only update the statistics in memory; nothing is written on the booking path. save(), called
+# once a run (or daemon job) is over, merges this process's lookups into the file as it is on disk at
+# that moment, under a file lock, so account processes running side by side never drop each other's.
+#
+# Review the recorded selectors with:
+#   python selector_resolver.py [selector_cache.json]
+import argparse
+import json
+import os
+import threading
+import time
+try:
+    import fcntl
+except ImportError:  # Windows: saves are then only serialized within one process.
+    fcntl = None
+
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from selenium.webdriver.common.by import By
+
+import dom_waits
+
+# The selector kinds the in-page probe understands, keyed by Selenium's By constants.
+_KINDS = {By.XPATH: "xpath", By.CSS_SELECTOR: "css"}
+
+
+def _apply(cache, target, keys, winner, matched, now):
+    """Folds one lookup into `cache`; returns the previous winner if it stopped matching, else None."""
+    entry = cache.setdefault(target, {"winner": None, "selectors": {}})
+    previous = entry.get("winner")
+    for key, hit in zip(keys, matched):
+        stats = entry["selectors"].setdefault(key, {"hits": 0, "misses": 0, "last_seen": None})
+        if hit:
+            stats["hits"] += 1
+            stats["last_seen"] = max(now, stats["last_seen"] or 0)
+            stats.pop("stale_since", None)
+        else:
+            stats["misses"] += 1
+    stale = None
+    if previous in keys and not matched[keys.index(previous)]:
+        entry["selectors"][previous].setdefault("stale_since", now)
+        stale = previous
+    if winner:
+        entry["winner"] = winner
+    return stale
+
+
+def selector_key(selector):
+    """Returns the cache key of a (By, path) selector, e.g. "xpath://button[...]"."""
+    by, path = selector
+    if by == By.ID:
+        by, path = By.CSS_SELECTOR, f"#{path}"
+    if by not in _KINDS:
+        raise ValueError(f"Unsupported selector type: {by}")
+    return f"{_KINDS[by]}:{path}"
+
+
+class SelectorResolver:
+    """Resolves named targets from candidate selectors, learning which selector works for each."""
+
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self.cache = self._load()
+        # Lookups since the last save, as (target, keys, winner, matched, time); save() replays them onto the file.
+        self._pending = []
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable selector cache: {e}")
+            return {}
+
+    def save(self):
+        """Merges the lookups made since the last save into the cache file; call it off the booking path."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not self.cache_path or not pending:
+            return
+        try:
+            with open(f"{self.cache_path}.lock", "w") as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                # Start from what is on disk now: another account process may have saved since we loaded it.
+                cache = self._load()
+                for lookup in pending:
+                    _apply(cache, *lookup)
+                # Per-process temporary file, so a reader never sees a half-written cache.
+                tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(cache, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            print(f"⚠️ Could not save selector cache: {e}")
+            return
+        with self._lock:
+            # Keep what was recorded while saving on top of the merged statistics.
+            for lookup in self._pending:
+                _apply(cache, *lookup)
+            self.cache = cache
+
+    def find(self, driver, target, selectors, timeout=10):
+        """Returns the element of the first selector, in the given order, that matches a displayed element.
+
+        All selectors are checked at once, so the order only decides between several that match.
+
+        Raises NoSuchElementException when none of them matches within `timeout` seconds.
+        """
+        keys = [selector_key(s) for s in selectors]
+        candidates = [key.split(":", 1) for key in keys]
+        try:
+            result = dom_waits.wait_first_match(driver, candidates, timeout)
+        except TimeoutException:
+            self._record(target, keys, None, [False] * len(keys))
+            raise NoSuchElementException(f"No selector for '{target}' matched within {timeout}s: {', '.join(keys)}")
+        if not isinstance(result, dict):
+            # The polling fallback only returns the element, so there is nothing to learn from this run.
+            return result
+        self._record(target, keys, keys[result["index"]], result["matched"])
+        return result["element"]
+
+    def _record(self, target, keys, winner, matched):
+        """Updates the per-selector statistics in memory and reports a winner that stopped matching."""
+        lookup = (target, keys, winner, matched, time.time())
+        with self._lock:
+            previous = self.cache.get(target, {}).get("winner")
+            stale = _apply(self.cache, *lookup)
+            self._pending.append(lookup)
+        if stale:
+            print(f"⚠️ Selector for '{target}' stopped matching: {stale}"
+                  + (f" (now using {winner})" if winner else " (and no fallback matched)"))
+        if winner and winner != previous:
+            print(f"  - Selector for '{target}' resolved with {winner}.")
+
+    def stale(self):
+        """Returns (target, selector, stale_since) for every selector recorded as stale."""
+        return [(target, key, stats["stale_since"]) for target, entry in sorted(self.cache.items())
+                for key, stats in entry["selectors"].items() if "stale_since" in stats]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the learned selectors and the ones that stopped matching.")
+    parser.add_argument("path", nargs="?", default="selector_cache.json")
+    args = parser.parse_args(argv)
+    resolver = SelectorResolver(args.path)
+    if not resolver.cache:
+        print(f"No selectors recorded in {args.path}.")
+        return
+    for target, entry in sorted(resolver.cache.items()):
+        print(f"{target}: {entry.get('winner') or '(nothing matched yet)'}")
+        for key, stats in entry["selectors"].items():
+            seen = time.strftime("%Y-%m-%d %H:%M", time.localtime(stats["last_seen"])) if stats["last_seen"] else "never"
+            flag = "  ⚠️ stale" if "stale_since" in stats else ""
+            print(f"    {stats['hits']:>4} hit(s) {stats['misses']:>4} miss(es)  last seen {seen}  {key}{flag}")
+    stale = resolver.stale()
+    if stale:
+        print(f"\n{len(stale)} selector(s) stopped matching; the site may have changed.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# --- Persistent Session Cache ---
+# Saves the authenticated cookies and local storage after a successful login, so later runs
+# (and recoveries) can restore the session and go straight to the reservation page instead
+# of repeating the homepage -> cookie banner -> login form -> menu sequence.
+#
+# The cache holds live session secrets: the directory is created 0700, files are written 0600,
+# and files with looser permissions are refused.
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+
+import requests
+from selenium.webdriver.common.by import By
+
+# Reads every localStorage entry of the current browsing context together with its origin.
+READ_LOCAL_STORAGE_JS = "return {origin: location.origin, items: Object.assign({}, window.localStorage)};"
+
+# Injected into every new document (including iframes) to put back saved localStorage entries.
+RESTORE_LOCAL_STORAGE_JS = """
+(function (saved) {
+  var items = saved[location.origin];
+  if (!items) return;
+  try {
+    Object.keys(items).forEach(function (key) {
+      if (window.localStorage.getItem(key) === null) window.localStorage.setItem(key, items[key]);
+    });
+  } catch (e) {}
+})(%s);
+"""
+
+
+def cache_path(cache_dir, account):
+    """Returns the cache file for an account; the account name is hashed so it never appears on disk."""
+    key = hashlib.sha256(account.strip().lower().encode("utf-8")).hexdigest()[:24]
+    return os.path.join(cache_dir, f"session_{key}.json")
+
+
+def _read_local_storage(driver):
+    try:
+        return driver.execute_script(READ_LOCAL_STORAGE_JS)
+    except Exception:
+        # Some pages (e.g. about:blank or sandboxed frames) do not allow localStorage access.
+        return None
+
+
+def save_session(driver, account, reservation_url, cache_dir):
+    """Stores the browser's cookies and localStorage for the account. Expects the driver inside the reservation iframe."""
+    # CDP returns the cookies of every domain, including the iframe's and HttpOnly ones.
+    cookies = driver.execute_cdp_cmd("Network.getAllCookies", {})["cookies"]
+    storages = [_read_local_storage(driver)]
+    # Also read the main page's storage, then step back into the reservation iframe.
+    driver.switch_to.default_content()
+    storages.append(_read_local_storage(driver))
+    driver.switch_to.frame(driver.find_element(By.TAG_NAME, "iframe"))
+    record = {
+        "saved_at": time.time(),
+        "reservation_url": reservation_url,
+        "cookies": cookies,
+        "local_storage": {s["origin"]: s["items"] for s in storages if s and s.get("items")},
+    }
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    os.chmod(cache_dir, 0o700)
+    path = cache_path(cache_dir, account)
+    # A temporary file per process and thread: racing browsers and account processes may save at once.
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    # Create the file with owner-only permissions from the start, then swap it in atomically.
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(record, f)
+    os.replace(tmp_path, path)
+    print(f"  - 💾 Session cached ({len(cookies)} cookies).")
+
+
+def load_session(account, cache_dir, max_age_seconds):
+    """Returns the cached session record, or None if it is missing, unsafe, expired or unreadable."""
+    path = cache_path(cache_dir, account)
+    try:
+        mode = os.stat(path).st_mode
+    except FileNotFoundError:
+        return None
+    if mode & (stat.S_IRWXG | stat.S_IRWXO):
+        print(f"⚠️ Ignoring session cache with unsafe permissions ({oct(mode & 0o777)}): {path}")
+        return None
+    try:
+        with open(path, encoding="utf-8") as f:
+            record = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read session cache: {e}")
+        return None
+    now = time.time()
+    if now - record.get("saved_at", 0) > max_age_seconds:
+        print("  - Session cache is older than the maximum age.")
+        invalidate_session(account, cache_dir)
+        return None
+    # Drop cookies that have expired since they were saved (-1 marks a browser-session cookie).
+    record["cookies"] = [c for c in record.get("cookies", []) if c.get("expires", -1) in (-1, None) or c["expires"] > now]
+    if not record["cookies"]:
+        print("  - All cached cookies have expired.")
+        invalidate_session(account, cache_dir)
+        return None
+    return record
+
+
+def invalidate_session(account, cache_dir):
+    """Deletes the cached session for an account (e.g. after the site logged us out)."""
+    try:
+        os.remove(cache_path(cache_dir, account))
+        print("  - 🗑️ Session cache invalidated.")
+    except FileNotFoundError:
+        pass
+
+
+def is_session_valid(record, login_marker=">Inloggen<", timeout=5):
+    """Checks the cached cookies with one lightweight HTTP request to the reservation page."""
+    jar = requests.cookies.RequestsCookieJar()
+    for c in record["cookies"]:
+        jar.set(c["name"], c["value"], domain=c.get("domain"), path=c.get("path", "/"))
+    try:
+        response = requests.get(record["reservation_url"], cookies=jar, timeout=timeout, allow_redirects=False)
+    except requests.RequestException as e:
+        print(f"⚠️ Session check request failed: {e}")
+        return False
+    # A logged-out visitor gets redirected to the homepage or sees the login button.
+    return response.status_code == 200 and login_marker not in response.text
+
+
+def restore_session(driver, record):
+    """Loads the cached cookies and localStorage into the browser and opens the reservation page."""
+    # CDP can set cookies for any domain without first navigating to it.
+    cookies = [{k: v for k, v in c.items() if k in ("name", "value", "domain", "path", "expires", "httpOnly", "secure", "sameSite")}
+               for c in record["cookies"]]
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setCookies", {"cookies": cookies})
+    if record.get("local_storage"):
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument",
+                               {"source": RESTORE_LOCAL_STORAGE_JS % json.dumps(record["local_storage"])})
+    driver.get(record["reservation_url"])
@@ -0,0 +1,73 @@
+# Ranked preferences and the SQLite snapshot store.
+import pytest
+
+import availability
+
+
+def slot(court, time, free):
+    return {"court": court, "time": time, "clickable": free}
+
+
+def test_parse_preferences_normalizes_and_deduplicates():
+    prefs = availability.parse_preferences(["20:30  -  21:30", {"time": "19:30 - 20:30", "court": "P 3"}, "20:30 - 21:30"])
+    assert prefs == [{"time": "20:30 - 21:30", "court": None}, {"time": "19:30 - 20:30", "court": "P 3"}]
+
+
+def test_parse_preferences_pins_to_a_court():
+    value = [{"time": "20:30 - 21:30", "court": "P 2"}, "19:30 - 20:30"]
+    assert availability.parse_preferences(value, court="P 1") == [{"time": "19:30 - 20:30", "court": "P 1"}]
+    assert availability.parse_preferences({"time": "20:30 - 21:30", "court": "P 2"}, court="P 1") == []
+
+
+@pytest.mark.parametrize("value", [None, "", [], [{"court": "P 1"}], [42]])
+def test_parse_preferences_rejects_malformed_values(value):
+    with pytest.raises(ValueError):
+        availability.parse_preferences(value)
+
+
+def test_describe():
+    assert availability.describe("20:30 - 21:30") == "20:30 - 21:30"
+    assert availability.describe([{"time": "20:30 - 21:30", "court": "P 3"}, "19:30 - 20:30", "21:30 - 22:30"]) == \
+        "20:30 - 21:30 on P 3 (+2 fallbacks)"
+
+
+def test_rank_free_orders_by_preference_and_skips_taken_slots():
+    slots = [slot("P 1 (Padel)", "19:30 - 20:30", True), slot("P 1 (Padel)", "20:30 - 21:30", False),
+             slot("P 2 (Padel)", "20:30 - 21:30", True), slot("P 3", "19:30 - 20:30", True)]
+    prefs = availability.parse_preferences([{"time": "19:30 - 20:30", "court": "P 3"}, "20:30 - 21:30", "19:30 - 20:30"])
+    assert availability.rank_free(slots, prefs) == [(3, 0), (2, 1), (0, 2)]
+
+
+def test_court_matches_does_not_confuse_prefixes():
+    assert availability.court_matches("P 1 (Padel)", "P 1")
+    assert not availability.court_matches("P 10", "P 1")
+    assert availability.court_matches(None, None)
+
+
+def test_slots_from_payload():
+    payload = {"courts": [{"name": "P 1", "slots": [{"id": "a", "time": "20:30  - 21:30", "available": True}]}]}
+    assert availability.slots_from_payload(payload) == [
+        {"id": "a", "time": "20:30 - 21:30", "available": True, "court": "P 1", "clickable": True}]
+
+
+def test_snapshot_store_records_only_changes(tmp_path):
+    store = availability.SnapshotStore(str(tmp_path / "availability.db"))
+    date = "2026-10-20"
+    first = [slot("P 1", "19:30 - 20:30", True), slot("P 1", "20:30 - 21:30", True)]
+    assert store.record(date, "Dinsdag", first, taken_at=1) == 2
+    assert store.record(date, "Dinsdag", first, taken_at=2) == 0
+    second = [slot("P 1", "19:30 - 20:30", False)]
+    assert store.record(date, "Dinsdag", second, taken_at=3) == 2
+    assert store.grid(date) == {("P 1", "19:30 - 20:30"): False}
+    history = store.history(date)
+    assert [h["taken_at"] for h in history] == [3, 1]
+    assert history[0]["changes"] == [("P 1", "19:30 - 20:30", 0), ("P 1", "20:30 - 21:30", None)]
+    assert store.dates() == [date]
+
+
+def test_snapshot_store_background_writes(tmp_path):
+    store = availability.SnapshotStore(str(tmp_path / "availability.db"))
+    store.submit("2026-10-20", "Dinsdag", [slot("P 2", "21:30 - 22:30", True)])
+    store.submit("2026-10-20", "Dinsdag", [])
+    store.drain()
+    assert store.grid("2026-10-20") == {("P 2", "21:30 - 22:30"): True}
@@ -0,0 +1,104 @@
+# The HTTP booking engine against the local stand-in site (mock_site.py); no browser needed.
+import datetime
+
+import pytest
+
+import http_engine
+import mock_site
+
+DAY = http_engine.DAY_NAMES[(datetime.date.today() + datetime.timedelta(days=1)).weekday()]
+PLAYERS = mock_site.DEFAULT_PLAYERS[:3]
+TOKEN = "test-session"
+
+
+@pytest.fixture
+def club():
+    club = mock_site.MockClub(courts=2)
+    club.sessions.add(TOKEN)
+    server, base_url = mock_site.start_server(club)
+    club.api_base = base_url + "api"
+    yield club
+    server.shutdown()
+
+
+def backend_for(club, **kwargs):
+    record = {"cookies": [{"name": "mock_session", "value": TOKEN, "domain": "127.0.0.1", "path": "/"}]}
+    return http_engine.HttpBackend(club.api_base, record, **dict({"attempts": 1, "interval": 0}, **kwargs))
+
+
+def slot_id(court, slot_time):
+    return f"{http_engine.next_date_for_day(DAY).isoformat()}|{court}|{slot_time}"
+
+
+def test_books_the_first_preference(club):
+    backend = backend_for(club)
+    assert backend.book(DAY, mock_site.DEFAULT_TIMES[1], PLAYERS)
+    assert list(club.bookings) == [slot_id("P 1", mock_site.DEFAULT_TIMES[1])]
+    assert club.bookings[slot_id("P 1", mock_site.DEFAULT_TIMES[1])]["players"] == ["member-1", "member-2", "member-3"]
+
+
+def test_falls_back_to_the_next_ranked_time(club):
+    for court in club.courts:
+        club.reserve(slot_id(court, mock_site.DEFAULT_TIMES[1]), [])
+    backend = backend_for(club)
+    assert backend.book(DAY, [mock_site.DEFAULT_TIMES[1], {"time": mock_site.DEFAULT_TIMES[2], "court": "P 2"}], PLAYERS)
+    assert slot_id("P 2", mock_site.DEFAULT_TIMES[2]) in club.bookings
+    assert len(club.bookings) == len(club.courts) + 1
+
+
+def test_taken_slot_is_not_an_error(club):
+    taken = slot_id("P 1", mock_site.DEFAULT_TIMES[0])
+    club.reserve(taken, [])
+    assert backend_for(club).reserve(taken, ["member-1"]) is False
+
+
+def test_no_acceptable_slot_returns_false(club):
+    for court in club.courts:
+        club.reserve(slot_id(court, mock_site.DEFAULT_TIMES[0]), [])
+    assert backend_for(club).book(DAY, mock_site.DEFAULT_TIMES[0], PLAYERS) is False
+
+
+def test_expired_session_raises_backend_error(club):
+    club.sessions.clear()
+    backend = backend_for(club)
+    with pytest.raises(http_engine.BackendError):
+        backend.book(DAY, mock_site.DEFAULT_TIMES[1], PLAYERS)
+    with pytest.raises(http_engine.BackendError):
+        backend.reserve(slot_id("P 1", mock_site.DEFAULT_TIMES[1]), ["member-1"])
+    assert not club.bookings
+
+
+def test_server_error_on_reserve_is_ambiguous(club):
+    # The gateway gives up while the booking still goes through; another engine must not try again.
+    club.reservation_error = 504
+    with pytest.raises(http_engine.AmbiguousBookingError):
+        backend_for(club).book(DAY, mock_site.DEFAULT_TIMES[1], PLAYERS)
+    assert len(club.bookings) == 1
+
+
+def test_batch_reports_every_job_in_order(club):
+    for court in club.courts:
+        club.reserve(slot_id(court, mock_site.DEFAULT_TIMES[0]), [])
+    results = backend_for(club).book_batch([(DAY, mock_site.DEFAULT_TIMES[0]), (DAY, [mock_site.DEFAULT_TIMES[2]])], PLAYERS)
+    assert [r["status"] for r in results] == ["no_slot", "booked"]
+    club.reservation_error = 502
+    results = backend_for(club).book_batch([(DAY, mock_site.DEFAULT_TIMES[1])], PLAYERS)
+    assert [r["status"] for r in results] == ["uncertain"]
+
+
+def test_unknown_player_raises_backend_error(club):
+    with pytest.raises(http_engine.BackendError):
+        backend_for(club).book(DAY, mock_site.DEFAULT_TIMES[1], ["Nobody"])
+
+
+def test_missing_configuration_raises_backend_error():
+    with pytest.raises(http_engine.BackendError):
+        http_engine.HttpBackend(None, {"cookies": []})
+    with pytest.raises(http_engine.BackendError):
+        http_engine.HttpBackend("http://127.0.0.1:1/api", None)
+
+
+def test_configured_paths_are_used(club):
+    backend = backend_for(club, paths={"players": "missing"})
+    with pytest.raises(http_engine.BackendError):
+        backend.book(DAY, mock_site.DEFAULT_TIMES[1], PLAYERS)
@@ -0,0 +1,99 @@
+# RetryScheduler with an injected clock, sleep and random source.
+import pytest
+
+from retry_scheduler import RetryScheduler
+
+TIERS = ["reselect", "refresh", "relogin"]
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+
+def scheduler(clock, **kwargs):
+    return RetryScheduler(TIERS, clock=clock, sleep=clock.sleep, rng=lambda: 0.5, **kwargs)
+
+
+def test_escalates_after_consecutive_failures_and_resets_after_recovery():
+    s = scheduler(FakeClock(), escalate_after=2)
+    s.failed()
+    assert s.tier == "reselect"
+    s.failed()
+    assert s.tier == "refresh"
+    s.recovered("refresh")
+    assert s.tier == "reselect"
+
+
+def test_refreshed_attempt_resets_the_streak():
+    s = scheduler(FakeClock(), escalate_after=2)
+    s.failed()
+    s.refreshed()
+    s.failed()
+    assert s.tier == "reselect"
+
+
+def test_escalate_to_a_tier_and_step_down():
+    s = scheduler(FakeClock())
+    s.escalate("relogin")
+    assert s.tier == "relogin"
+    s.step_down()
+    assert s.tier == "refresh"
+    s.escalate()
+    s.escalate()
+    assert s.tier == "relogin"
+
+
+def test_cheap_tier_recovery_keeps_the_streak():
+    s = scheduler(FakeClock(), escalate_after=2)
+    s.failed()
+    s.recovered("reselect")
+    s.failed()
+    assert s.tier == "refresh"
+
+
+def test_exhausted_by_attempts_or_budget():
+    clock = FakeClock()
+    s = scheduler(clock, max_attempts=2, budget_seconds=10)
+    s.next_attempt()
+    assert not s.exhausted()
+    clock.now += 10
+    assert s.exhausted()
+    s = scheduler(clock, max_attempts=2)
+    s.next_attempt()
+    s.next_attempt()
+    assert s.exhausted()
+
+
+def test_tight_interval_inside_the_window_and_backoff_outside():
+    clock = FakeClock()
+    s = scheduler(clock, window=(clock.now, clock.now + 5), tight_interval=0.25, backoff_base=1.0, backoff_max=3.0)
+    assert s.pause() == 0.25
+    clock.now += 10
+    # rng 0.5 means no jitter: 1, 2, 4 capped at 3.
+    assert [s.pause() for _ in range(3)] == [1.0, 2.0, 3.0]
+    assert clock.slept == [0.25, 1.0, 2.0, 3.0]
+
+
+def test_jitter_stays_within_bounds():
+    clock = FakeClock()
+    low = RetryScheduler(TIERS, clock=clock, sleep=clock.sleep, rng=lambda: 0.0, jitter=0.3)
+    high = RetryScheduler(TIERS, clock=clock, sleep=clock.sleep, rng=lambda: 1.0, jitter=0.3)
+    assert low.interval() == pytest.approx(0.7)
+    assert high.interval() == pytest.approx(1.3)
+
+
+def test_pause_never_sleeps_past_the_budget():
+    clock = FakeClock()
+    s = scheduler(clock, budget_seconds=1.5, backoff_base=4.0)
+    assert s.pause() == pytest.approx(1.5)
+    assert s.pause() == 0
+    assert clock.slept == [pytest.approx(1.5)]
@@ -0,0 +1,165 @@
+# --- Per-Phase Timing ---
+# A lightweight tracer for the booking run: every phase (browser launch, login, day navigation, slot
+# scan, confirmation, recovery...) and every retry attempt is timed with perf_counter and kept in
+# memory; at the end of the run one JSON line is appended to the trace file. The per-span cost is a
+# clock read and a list append, so it stays on in production.
+#
+# A run normally covers the whole process (race-mode threads add to it). The daemon instead traces
+# every job as its own run, local to the job's thread, so concurrent jobs never mix their spans.
+#
+# Aggregate the collected runs with:
+#   python tracing.py trace.jsonl [--last 50]
+import argparse
+import functools
+import json
+import math
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# The run being traced in this process (None when tracing is not active).
+_current = None
+# A run local to one thread (a daemon job), which takes precedence over the process-wide one there.
+_local = threading.local()
+# Serializes appends to the trace file; concurrent daemon jobs finish independently.
+_write_lock = threading.Lock()
+
+
+def _active():
+    return getattr(_local, "trace", None) or _current
+
+
+class Trace:
+    """Collects the timed spans of one run."""
+
+    def __init__(self, **meta):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.started_at = time.time()
+        self._t0 = time.perf_counter()
+        self.meta = meta
+        self.spans = []
+
+    @contextmanager
+    def span(self, phase, **attrs):
+        """Times the enclosed block. Yields a dict the caller may add attributes to (e.g. a result)."""
+        record = {"phase": phase, **attrs}
+        started = time.perf_counter()
+        try:
+            yield record
+            record.setdefault("status", "ok")
+        except BaseException as e:
+            record["status"] = e.__class__.__name__
+            raise
+        finally:
+            record["start_ms"] = round((started - self._t0) * 1000, 1)
+            record["ms"] = round((time.perf_counter() - started) * 1000, 1)
+            # Race mode times several browsers at once; name the thread so their spans can be told apart.
+            if threading.current_thread() is not threading.main_thread():
+                record["thread"] = threading.current_thread().name
+            self.spans.append(record)
+
+    def to_record(self, outcome):
+        return {"run_id": self.run_id, "started_at": round(self.started_at, 3), "outcome": outcome,
+                "total_ms": round((time.perf_counter() - self._t0) * 1000, 1), "meta": self.meta, "spans": self.spans}
+
+
+def start_run(thread_local=False, **meta):
+    """Starts tracing a run in this process (or, with `thread_local`, in this thread only) and returns its Trace."""
+    global _current
+    trace = Trace(**meta)
+    if thread_local:
+        _local.trace = trace
+    else:
+        _current = trace
+    return trace
+
+
+def finish_run(path, outcome):
+    """Appends the current run (this thread's own, if it has one) to the JSONL trace file and stops tracing it."""
+    global _current
+    trace = getattr(_local, "trace", None)
+    if trace is not None:
+        _local.trace = None
+    else:
+        trace, _current = _current, None
+    if trace is None or not path:
+        return
+    try:
+        with _write_lock, open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(trace.to_record(outcome)) + "\n")
+        print(f"⏱️ Timing trace written to {path} ({len(trace.spans)} spans, {trace.to_record(outcome)['total_ms'] / 1000:.1f}s).")
+    except OSError as e:
+        print(f"⚠️ Could not write timing trace: {e}")
+
+
+@contextmanager
+def span(phase, **attrs):
+    """Times a block in the current run; a no-op (yielding a throwaway dict) when no run is active."""
+    trace = _active()
+    if trace is None:
+        yield {}
+        return
+    with trace.span(phase, **attrs) as record:
+        yield record
+
+
+def traced(phase):
+    """Decorator that times every call of a function as `phase`."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(phase):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# --- Run-over-run statistics ---
+def percentile(ordered, fraction):
+    """Nearest-rank percentile of an already sorted list."""
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def load_runs(paths, last=None):
+    runs = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            runs += [json.loads(line) for line in f if line.strip()]
+    runs.sort(key=lambda r: r["started_at"])
+    return runs[-last:] if last else runs
+
+
+def summarize_runs(runs):
+    """Returns {phase: {"count", "p50", "p95", "max"}} in milliseconds, plus a "total" row."""
+    durations = {"total": [r["total_ms"] for r in runs]}
+    for run in runs:
+        for s in run["spans"]:
+            durations.setdefault(s["phase"], []).append(s["ms"])
+    stats = {}
+    for phase, values in durations.items():
+        ordered = sorted(values)
+        stats[phase] = {"count": len(ordered), "p50": percentile(ordered, 0.5), "p95": percentile(ordered, 0.95), "max": ordered[-1]}
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Aggregate booking-run timing traces into per-phase statistics.")
+    parser.add_argument("paths", nargs="*", default=["trace.jsonl"], help="JSONL trace files (default: trace.jsonl)")
+    parser.add_argument("--last", type=int, help="Only use the most recent N runs.")
+    args = parser.parse_args(argv)
+    runs = load_runs(args.paths, args.last)
+    if not runs:
+        print("No runs recorded.")
+        return
+    outcomes = {}
+    for run in runs:
+        outcomes[run["outcome"]] = outcomes.get(run["outcome"], 0) + 1
+    print(f"{len(runs)} run(s): " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(outcomes.items())))
+    print(f"{'phase':<22}{'count':>7}{'p50 ms':>11}{'p95 ms':>11}{'max ms':>11}")
+    for phase, s in sorted(summarize_runs(runs).items(), key=lambda item: -item[1]["p50"]):
+        print(f"{phase:<22}{s['count']:>7}{s['p50']:>11.1f}{s['p95']:>11.1f}{s['max']:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()